@@ -7,8 +7,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 from app.main import app
 
-# Wrap the FastAPI app with Mangum for Vercel
-handler = Mangum(app)
+# Wrap the FastAPI app with Mangum for Vercel. Lifespan is skipped: warm-up
+# only adds to cold starts here, and shared clients/services init lazily.
+handler = Mangum(app, lifespan="off")
 
 # For local testing
 if __name__ == "__main__":
@@ -1,25 +1,166 @@
-from typing import Optional
-from fastapi import Depends
+import asyncio
+import time
+from functools import lru_cache
+from typing import Annotated, Optional
+import httpx
+from fastapi import Depends, Path, Request
 from app.core.config import settings
 
+# Keep more idle connections alive, for longer, than httpx's 20 / 5s defaults
+# so bursts of requests reuse warm HTTP/2 connections to Supabase.
+SUPABASE_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30)
+
+
+def _pooled(session: httpx.Client) -> httpx.Client:
+    """Rebuild an SDK-created httpx session with our pool limits, keeping its config."""
+    pooled = type(session)(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        follow_redirects=session.follow_redirects,
+        http2=True,
+        limits=SUPABASE_HTTP_LIMITS,
+    )
+    session.close()
+    return pooled
+
+
+def _tune_pools(client) -> None:
+    """Apply SUPABASE_HTTP_LIMITS to the PostgREST and Storage sessions.
+    Leaves the SDK defaults in place if its internals differ from what we expect.
+    """
+    try:
+        client.postgrest.session = _pooled(client.postgrest.session)
+        storage = client.storage
+        storage.session = storage._client = _pooled(storage.session)
+    except AttributeError:
+        pass
+
+
+def client_ip(request: Optional[Request]) -> Optional[str]:
+    """Client IP for rate limiting and logs: first X-Forwarded-For hop, then X-Real-IP,
+    then the socket peer. Parsed once per request and kept on request.state."""
+    if request is None:
+        return None
+    try:
+        return request.state.client_ip
+    except AttributeError:
+        pass
+    # Starlette normalizes header names to lowercase
+    headers = request.headers
+    ip = headers.get("x-forwarded-for")
+    if ip:
+        ip = ip.partition(",")[0].strip()
+    else:
+        client = request.client
+        ip = headers.get("x-real-ip") or (client.host if client else None)
+    request.state.client_ip = ip
+    return ip
+
+
+@lru_cache(maxsize=1)
+def _client():
+    """Build the Supabase client once per process.
+    Exceptions propagate (and are not cached) so a failed attempt can be retried.
+    """
+    from supabase import create_client
+
+    client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+    _tune_pools(client)
+    return client
+
 
 def get_supabase_client():
-    """Create and return a Supabase client if env is configured, else None.
+    """Return the shared Supabase client if env is configured, else None.
     Import inside the function to avoid hard dependency during boot.
     """
     if not settings.SUPABASE_URL or not settings.SUPABASE_SERVICE_ROLE_KEY:
         return None
     try:
-        from supabase import create_client
-
-        return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+        return _client()
     except Exception:
         return None
 
 
+# An unreachable SUPABASE_DB_URL must not stall every list request behind the lock:
+# connects give up quickly and a failed attempt isn't retried for a while.
+PG_POOL_CONNECT_TIMEOUT = 5
+PG_POOL_RETRY_SECONDS = 30
+
+_pg_pool = None
+_pg_pool_failed = False
+_pg_pool_retry_at = 0.0
+_pg_pool_lock = asyncio.Lock()
+
+
+async def get_pg_pool():
+    """Return a shared asyncpg pool for direct reads, or None to use PostgREST.
+    Only used when SUPABASE_DB_URL is set and asyncpg is installed.
+    """
+    global _pg_pool, _pg_pool_failed, _pg_pool_retry_at
+    if _pg_pool is not None or _pg_pool_failed or not settings.SUPABASE_DB_URL:
+        return _pg_pool
+    if time.monotonic() < _pg_pool_retry_at:
+        return None
+    async with _pg_pool_lock:
+        if _pg_pool is None and not _pg_pool_failed and time.monotonic() >= _pg_pool_retry_at:
+            try:
+                import asyncpg
+                import orjson
+
+                async def _init(conn):
+                    await conn.set_type_codec("jsonb", encoder=lambda v: orjson.dumps(v).decode(), decoder=orjson.loads, schema="pg_catalog")
+
+                # Supavisor's transaction mode can't keep prepared statements, so the cache
+                # is off unless configured; session mode / direct connections can reuse plans
+                _pg_pool = await asyncpg.create_pool(
+                    dsn=settings.SUPABASE_DB_URL,
+                    min_size=1,
+                    max_size=20,
+                    statement_cache_size=settings.SUPABASE_DB_STATEMENT_CACHE_SIZE,
+                    timeout=PG_POOL_CONNECT_TIMEOUT,
+                    init=_init,
+                )
+            except ImportError:
+                # asyncpg not installed: stay on PostgREST for the life of the process
+                _pg_pool_failed = True
+            except Exception:
+                # Unreachable or misconfigured: use PostgREST until the backoff expires
+                _pg_pool_retry_at = time.monotonic() + PG_POOL_RETRY_SECONDS
+                return None
+    return _pg_pool
+
+
+async def close_pg_pool() -> None:
+    global _pg_pool
+    if _pg_pool is not None:
+        await _pg_pool.close()
+        _pg_pool = None
+
+
 SupabaseClient = Optional[object]
 
+# Row ids are Postgres UUIDs; malformed ones are rejected with 422 before any DB call
+UUID_PATTERN = r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+ResourceId = Annotated[str, Path(pattern=UUID_PATTERN)]
+
+
+# The installed supabase-py fixes the response shape, so pick the accessor once
+try:
+    from postgrest import APIResponse  # noqa: F401
+
+    def response_data(res) -> list:
+        """Return the rows from a Supabase query response."""
+        return res.data or []
+except ImportError:
+    def response_data(res) -> list:
+        """Return the rows from a legacy dict-shaped Supabase response."""
+        return res.get("data") or []
+
 
 def get_supabase() -> SupabaseClient:
+    """Route dependency for Supabase access.
+    Every request receives the same pooled client built by _client(); nothing is
+    constructed per request, so keep heavy setup in _client/_tune_pools.
+    """
     return get_supabase_client()
-
@@ -1,28 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from app.core.security import admin_required, UserPrincipal
-from app.api.deps import get_supabase
+from app.api.deps import get_supabase, response_data
 
 router = APIRouter(prefix="/admin", tags=["admin"])  # optional
 
+USER_COLUMNS = "user_id,name,created_at,updated_at"
+PROJECT_COLUMNS = "id,user_id,title,description,created_at,updated_at"
+
+# Short-lived cache for bursty admin refreshes. Keys include every query
+# parameter; the data is the same for all admins, who are checked before lookup.
+_admin_cache: TTLCache = TTLCache(maxsize=256, ttl=30)
+
 
 @router.get("/users")
-async def list_users(_: UserPrincipal = Depends(admin_required), supabase=Depends(get_supabase)):
+async def list_users(
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = Query(None, description="Return users with user_id after this cursor"),
+    _: UserPrincipal = Depends(admin_required),
+    supabase=Depends(get_supabase),
+):
     if not supabase:
         raise HTTPException(status_code=501, detail="Supabase not configured")
+    key = ("users", limit, after)
+    if key in _admin_cache:
+        return ORJSONResponse(_admin_cache[key])
     try:
         # If using Clerk, typically you'd sync a shadow user table; otherwise this could be profiles
-        res = supabase.table("profiles").select("*").execute()
-        return res.data if hasattr(res, "data") else res.get("data") or []
+        query = supabase.table("profiles").select(USER_COLUMNS).order("user_id").limit(limit)
+        if after:
+            query = query.gt("user_id", after)
+        res = query.execute()
+        data = response_data(res)
+        _admin_cache[key] = data
+        return ORJSONResponse(data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list users: {e}")
 
 
 @router.get("/projects")
-async def list_projects(_: UserPrincipal = Depends(admin_required), supabase=Depends(get_supabase)):
+async def list_projects(
+    limit: int = Query(100, ge=1, le=500),
+    before: Optional[str] = Query(None, description="Return projects created before this timestamp cursor"),
+    _: UserPrincipal = Depends(admin_required),
+    supabase=Depends(get_supabase),
+):
     if not supabase:
         raise HTTPException(status_code=501, detail="Supabase not configured")
+    key = ("projects", limit, before)
+    if key in _admin_cache:
+        return ORJSONResponse(_admin_cache[key])
     try:
-        res = supabase.table("projects").select("*").order("created_at", desc=True).execute()
-        return res.data if hasattr(res, "data") else res.get("data") or []
+        query = supabase.table("projects").select(PROJECT_COLUMNS).order("created_at", desc=True).limit(limit)
+        if before:
+            query = query.lt("created_at", before)
+        res = query.execute()
+        data = response_data(res)
+        _admin_cache[key] = data
+        return ORJSONResponse(data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list projects: {e}")
+
+
+@router.get("/overview")
+async def admin_overview(
+    limit: int = Query(100, ge=1, le=500),
+    _: UserPrincipal = Depends(admin_required),
+    supabase=Depends(get_supabase),
+):
+    """Recent users and projects in one round trip via the admin_overview RPC."""
+    if not supabase:
+        raise HTTPException(status_code=501, detail="Supabase not configured")
+    key = ("overview", limit)
+    if key in _admin_cache:
+        return ORJSONResponse(_admin_cache[key])
+    try:
+        res = supabase.rpc("admin_overview", {"_limit": limit}).execute()
+        data = getattr(res, "data", None) or {"users": [], "projects": []}
+        _admin_cache[key] = data
+        return ORJSONResponse(data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load admin overview: {e}")
@@ -3,18 +3,22 @@ Anonymous Upload API Endpoints
 Enhanced version with robust error handling for transient issues
 """
 
-import uuid
+import json
+import random
 import asyncio
-from typing import Optional
+import inspect
+from functools import wraps
+from secrets import token_hex
+from typing import TYPE_CHECKING, Optional
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from loguru import logger
 
 from app.core.security import get_current_user, UserPrincipal
 from app.core.config import settings
-from app.api.deps import get_supabase_client
+from app.api.deps import client_ip, get_supabase_client
 from app.models.anonymous import (
     AnonymousUploadResponse,
     AnonymousStatusResponse,
@@ -24,49 +28,167 @@ from app.models.anonymous import (
     AnonymousRateLimitInfo,
     AnonymousErrorResponse
 )
-from app.services.anonymous_service import AnonymousService
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime: the service pulls in the transcription stack
+    # (groq, background executor), which dominates serverless cold starts
+    from app.services.anonymous_service import AnonymousService
 
 # Create router with prefix
 router = APIRouter(prefix="/anonymous", tags=["anonymous"])
 
+def _model_response(model) -> Response:
+    """Serialize a response model straight to JSON bytes in pydantic-core.
+    Returning a Response skips FastAPI's dump -> re-validate -> encode pass over
+    response_model, which stays on the route for the OpenAPI schema.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+# Process-wide service instance, initialized once in the app lifespan
+_service: Optional["AnonymousService"] = None
+
+# Serialized health payload; limits are fixed for the life of the process
+_health_json: Optional[bytes] = None
 
-async def get_anonymous_service_with_retry(max_retries: int = 3) -> AnonymousService:
+# Retry backoff: truncated exponential with jitter, capped per request
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 1.0
+RETRY_BUDGET_SECONDS = 1.0
+
+
+async def _sleep_backoff(attempt: int, deadline: Optional[float] = None) -> bool:
     """
-    Get AnonymousService with retry logic for initialization issues.
-    
+    Sleep before the next retry using jittered exponential backoff.
+
+    Args:
+        attempt: Zero-based attempt number that just failed
+        deadline: Optional event-loop time after which no more retries are made
+
+    Returns:
+        True if the caller should retry, False if the deadline would be exceeded
+    """
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)) * (0.5 + random.random())
+    if deadline is not None and asyncio.get_running_loop().time() + delay > deadline:
+        return False
+    await asyncio.sleep(delay)
+    return True
+
+
+async def init_anonymous_service(max_retries: int = 3) -> Optional["AnonymousService"]:
+    """
+    Initialize the shared AnonymousService with retry logic.
+    Called once at startup so requests never pay the init/retry cost.
+
     Args:
         max_retries: Maximum number of retry attempts
-        
+
     Returns:
-        AnonymousService instance
-        
-    Raises:
-        HTTPException: If service cannot be initialized after retries
+        AnonymousService instance, or None if initialization failed
     """
+    global _service
+    from app.services.anonymous_service import AnonymousService
+
     for attempt in range(max_retries):
         try:
             supabase = get_supabase_client()
             if supabase is None:
                 raise Exception("Supabase client is None")
-            
-            service = AnonymousService(supabase)
-            return service
-            
+
+            _service = AnonymousService(supabase)
+            return _service
+
         except Exception as e:
             logger.warning(f"AnonymousService init attempt {attempt + 1} failed: {e}")
             if attempt < max_retries - 1:
-                await asyncio.sleep(0.1 * (attempt + 1))  # Exponential backoff
-            else:
-                logger.error(f"Failed to initialize AnonymousService after {max_retries} attempts")
+                await _sleep_backoff(attempt)
+
+    logger.error(f"Failed to initialize AnonymousService after {max_retries} attempts")
+    return None
+
+
+def get_service() -> "AnonymousService":
+    """
+    Dependency returning the process-global AnonymousService.
+
+    Falls back to a single lazy init attempt when startup init did not run or failed.
+
+    Raises:
+        HTTPException: If the service is unavailable
+    """
+    global _service
+    if _service is None:
+        try:
+            from app.services.anonymous_service import AnonymousService
+
+            supabase = get_supabase_client()
+            if supabase is not None:
+                _service = AnonymousService(supabase)
+        except Exception as e:
+            logger.warning(f"AnonymousService lazy init failed: {e}")
+    if _service is None:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "service_unavailable",
+                "message": "Anonymous service temporarily unavailable. Please try again.",
+                "retry_after": 5
+            }
+        )
+    return _service
+
+
+def _client_ip(request: Optional[Request]) -> str:
+    """Client IP as the anonymous service sees it, or "unknown"."""
+    return client_ip(request) or "unknown"
+
+
+def handled(error_code: str, message: str, log_message: str, **extra_detail):
+    """
+    Wrap a route with the shared correlation-ID error handling.
+
+    The route receives a fresh ``correlation_id`` keyword argument, hidden from
+    FastAPI's view of the signature. HTTPExceptions pass through unchanged; any
+    other exception is logged and turned into a 500 carrying the correlation ID.
+
+    Args:
+        error_code: Machine-readable error code for the 500 response
+        message: Human-readable message for the 500 response
+        log_message: Message logged when the route fails
+        **extra_detail: Additional fields for the 500 response detail
+    """
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            correlation_id = token_hex(8)
+            try:
+                return await fn(*args, correlation_id=correlation_id, **kwargs)
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.opt(exception=settings.API_DEBUG).error(
+                    log_message,
+                    correlation_id=correlation_id,
+                    error=str(e),
+                    error_type=type(e).__name__
+                )
                 raise HTTPException(
-                    status_code=503,
+                    status_code=500,
                     detail={
-                        "error": "service_unavailable",
-                        "message": "Anonymous service temporarily unavailable. Please try again.",
-                        "retry_after": 5
+                        "error": error_code,
+                        "message": message,
+                        "correlation_id": correlation_id,
+                        **extra_detail
                     }
                 )
 
+        signature = inspect.signature(fn)
+        wrapper.__signature__ = signature.replace(
+            parameters=[p for p in signature.parameters.values() if p.name != "correlation_id"]
+        )
+        return wrapper
+    return decorator
+
 
 async def execute_with_retry(operation, *args, max_retries: int = 2, **kwargs):
     """
@@ -82,8 +204,11 @@ async def execute_with_retry(operation, *args, max_retries: int = 2, **kwargs):
         Result of the operation
         
     Raises:
-        HTTPException: If operation fails after all retries
+        HTTPException: If operation fails after all retries or the retry budget runs out
     """
+    # Same ID as the route and service logs, so a failed request can be traced end to end
+    correlation_id = kwargs.get("correlation_id") or token_hex(8)
+    deadline = asyncio.get_running_loop().time() + RETRY_BUDGET_SECONDS
     for attempt in range(max_retries + 1):
         try:
             return await operation(*args, **kwargs)
@@ -95,47 +220,53 @@ async def execute_with_retry(operation, *args, max_retries: int = 2, **kwargs):
             
             # Retry server errors (5xx) and other exceptions
             if attempt < max_retries:
-                logger.warning(f"Operation retry {attempt + 1}: {e}")
-                await asyncio.sleep(0.1 * (attempt + 1))
-            else:
-                raise
+                logger.warning(f"Operation retry {attempt + 1}: {e}", correlation_id=correlation_id)
+                if await _sleep_backoff(attempt, deadline):
+                    continue
+            raise
                 
         except Exception as e:
             if attempt < max_retries:
-                logger.warning(f"Unexpected error retry {attempt + 1}: {e}")
-                await asyncio.sleep(0.1 * (attempt + 1))
-            else:
-                logger.error(f"Operation failed after {max_retries + 1} attempts: {e}")
-                raise HTTPException(
-                    status_code=500,
-                    detail={
-                        "error": "operation_failed",
-                        "message": "Operation failed after retries. Please try again.",
-                        "correlation_id": str(uuid.uuid4())
-                    }
-                )
+                logger.warning(f"Unexpected error retry {attempt + 1}: {e}", correlation_id=correlation_id)
+                if await _sleep_backoff(attempt, deadline):
+                    continue
+            logger.error(f"Operation failed after {attempt + 1} attempts: {e}", correlation_id=correlation_id)
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "error": "operation_failed",
+                    "message": "Operation failed after retries. Please try again.",
+                    "correlation_id": correlation_id
+                }
+            )
 
 
 # Health check endpoint
 @router.get("/health")
-async def anonymous_service_health():
+async def anonymous_service_health(service: "AnonymousService" = Depends(get_service)):
     """Health check for anonymous upload service with enhanced error handling."""
+    global _health_json
     try:
-        service = await get_anonymous_service_with_retry(max_retries=2)
-        
-        return {
-            "status": "healthy",
-            "service": "anonymous_upload",
-            "limits": {
-                "max_file_size_mb": service.usage_limits.max_file_size_mb,
-                "max_uploads_per_hour": service.usage_limits.max_uploads_per_hour,
-                "max_uploads_per_day": service.usage_limits.max_uploads_per_day,
-                "max_duration_minutes": service.usage_limits.max_duration_minutes,
-                "allowed_file_types": service.usage_limits.allowed_file_types
-            },
-            "session_expiry_days": 7
-        }
-        
+        if _health_json is None:
+            _health_json = json.dumps({
+                "status": "healthy",
+                "service": "anonymous_upload",
+                "limits": {
+                    "max_file_size_mb": service.usage_limits.max_file_size_mb,
+                    "max_uploads_per_hour": service.usage_limits.max_uploads_per_hour,
+                    "max_uploads_per_day": service.usage_limits.max_uploads_per_day,
+                    "max_duration_minutes": service.usage_limits.max_duration_minutes,
+                    "allowed_file_types": sorted(service.usage_limits.allowed_file_types)
+                },
+                "session_expiry_days": 7
+            }).encode()
+
+        return Response(
+            content=_health_json,
+            media_type="application/json",
+            headers={"Cache-Control": "public, max-age=60"}
+        )
+
     except HTTPException:
         raise
     except Exception as e:
@@ -152,203 +283,147 @@ async def anonymous_service_health():
 
 # Rate limit info endpoint
 @router.get("/rate-limit", response_model=AnonymousRateLimitInfo)
-async def get_rate_limit_info(request: Request):
+@handled(
+    "rate_limit_check_failed",
+    "Failed to check rate limits. Please try again.",
+    "Rate limit check failed"
+)
+async def get_rate_limit_info(
+    request: Request,
+    service: "AnonymousService" = Depends(get_service),
+    *,
+    correlation_id: str
+):
     """Check rate limit status with enhanced error handling."""
-    correlation_id = str(uuid.uuid4())
+    log = logger.bind(correlation_id=correlation_id)
+    client_ip = _client_ip(request)
     
-    try:
-        # Extract client IP
-        client_ip = "unknown"
-        if request:
-            forwarded_for = request.headers.get("X-Forwarded-For")
-            if forwarded_for:
-                client_ip = forwarded_for.split(",")[0].strip()
-            elif hasattr(request, "client") and request.client:
-                client_ip = request.client.host
-        
-        logger.info("Rate limit check request", correlation_id=correlation_id, client_ip=client_ip)
-        
-        # Get service and execute with retry
-        service = await get_anonymous_service_with_retry()
-        response = await execute_with_retry(service.get_rate_limit_info, client_ip)
-        
-        logger.info("Rate limit info retrieved", correlation_id=correlation_id)
-        return response
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Rate limit check failed", correlation_id=correlation_id, error=str(e), exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": "rate_limit_check_failed",
-                "message": "Failed to check rate limits. Please try again.",
-                "correlation_id": correlation_id
-            }
-        )
+    log.info("Rate limit check request", client_ip=client_ip)
+    
+    response = await execute_with_retry(
+        service.get_rate_limit_info,
+        client_ip,
+        correlation_id=correlation_id
+    )
+    
+    log.info("Rate limit info retrieved")
+    return response
 
 
 @router.post("/upload", response_model=AnonymousUploadResponse)
+@handled("upload_failed", "Upload failed. Please try again.", "Anonymous upload failed")
 async def upload_file_anonymously(
     file: UploadFile = File(..., description="Audio/video file to upload"),
     name: str = Form(..., description="Project name", min_length=1, max_length=100),
     description: Optional[str] = Form(None, description="Optional project description", max_length=500),
     language: Optional[str] = Form("en", description="Language code (ISO 639-1)", max_length=5),
-    request: Request = None
+    request: Request = None,
+    service: "AnonymousService" = Depends(get_service),
+    *,
+    correlation_id: str
 ):
     """Upload file anonymously with enhanced error handling."""
-    correlation_id = str(uuid.uuid4())
+    log = logger.bind(correlation_id=correlation_id)
+    log.opt(lazy=True).info(
+        "Anonymous upload request",
+        file_name=lambda: file.filename,
+        client_ip=lambda: _client_ip(request)
+    )
     
-    try:
-        # Extract client info
-        client_ip = "unknown"
-        user_agent = None
-        if request:
-            forwarded_for = request.headers.get("X-Forwarded-For")
-            if forwarded_for:
-                client_ip = forwarded_for.split(",")[0].strip()
-            elif hasattr(request, "client") and request.client:
-                client_ip = request.client.host
-            user_agent = request.headers.get("User-Agent")
-        
-        logger.info("Anonymous upload request", correlation_id=correlation_id, file_name=file.filename)
-        
-        # Read file content from UploadFile
-        file_content = await file.read()
-        
-        # Get service - NO RETRY for upload since UploadFile can't be reused
-        service = await get_anonymous_service_with_retry()
-        response = await service.create_anonymous_upload(
-            file_content=file_content,
-            file_name=file.filename,
-            project_name=name,
-            description=description,
-            language=language,
-            request=request
-        )
-        
-        logger.info("Anonymous upload successful", correlation_id=correlation_id, session_token=response.session_token[:16] + "...")
-        return response
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(
-            "Anonymous upload failed", 
-            correlation_id=correlation_id, 
-            error=str(e), 
-            error_type=type(e).__name__,
-            exc_info=True
-        )
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": "upload_failed",
-                "message": "Upload failed. Please try again.",
-                "correlation_id": correlation_id
-            }
-        )
+    # NO RETRY for upload since UploadFile can't be reused;
+    # the service streams the file in chunks rather than reading it whole
+    response = await service.create_anonymous_upload(
+        file=file,
+        project_name=name,
+        description=description,
+        language=language,
+        request=request,
+        correlation_id=correlation_id
+    )
+    
+    log.opt(lazy=True).info("Anonymous upload successful", session_token=lambda: response.session_token[:16] + "...")
+    return response
 
 
 @router.get("/{session_token}/status", response_model=AnonymousStatusResponse)
-async def get_session_status(session_token: str):
+@handled("status_check_failed", "Failed to check status. Please try again.", "Status check failed")
+async def get_session_status(
+    session_token: str,
+    service: "AnonymousService" = Depends(get_service),
+    *,
+    correlation_id: str
+):
     """Get session status with enhanced error handling."""
-    correlation_id = str(uuid.uuid4())
-    logger.info("Status check request", correlation_id=correlation_id, session_token=session_token[:16] + "...")
+    log = logger.bind(correlation_id=correlation_id)
+    log.opt(lazy=True).info("Status check request", session_token=lambda: session_token[:16] + "...")
     
-    try:
-        # Get service and execute with retry - THIS IS WHERE THE 500 ERRORS WERE HAPPENING
-        service = await get_anonymous_service_with_retry()
-        response = await execute_with_retry(
-            service.get_session_status,
-            session_token,
-            max_retries=2
-        )
-        
-        logger.info("Status check successful", correlation_id=correlation_id, status=response.status)
-        return response
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Status check failed", correlation_id=correlation_id, error=str(e), exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": "status_check_failed",
-                "message": "Failed to check status. Please try again.",
-                "correlation_id": correlation_id
-            }
-        )
+    # Execute with retry - THIS IS WHERE THE 500 ERRORS WERE HAPPENING
+    response = await execute_with_retry(
+        service.get_session_status,
+        session_token,
+        correlation_id=correlation_id,
+        max_retries=2
+    )
+    
+    log.info("Status check successful", status=response.status)
+    return _model_response(response)
 
 
 @router.get("/{session_token}", response_model=AnonymousResultResponse)
-async def get_transcription_results(session_token: str):
+@handled(
+    "results_fetch_failed",
+    "Failed to fetch results. Please try again.",
+    "Results retrieval failed",
+    signup_suggestion="Sign up for priority support and guaranteed access!"
+)
+async def get_transcription_results(
+    session_token: str,
+    service: "AnonymousService" = Depends(get_service),
+    *,
+    correlation_id: str
+):
     """Get blurred results with enhanced error handling."""
-    correlation_id = str(uuid.uuid4())
-    logger.info("Results request", correlation_id=correlation_id, session_token=session_token[:16] + "...")
+    log = logger.bind(correlation_id=correlation_id)
+    log.opt(lazy=True).info("Results request", session_token=lambda: session_token[:16] + "...")
     
-    try:
-        # Get service and execute with retry - THIS IS WHERE THE OTHER 500 ERRORS WERE HAPPENING
-        service = await get_anonymous_service_with_retry()
-        response = await execute_with_retry(
-            service.get_blurred_results,
-            session_token,
-            max_retries=2
-        )
-        
-        logger.info("Results retrieved successfully", correlation_id=correlation_id, is_blurred=response.is_blurred)
-        return response
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Results retrieval failed", correlation_id=correlation_id, error=str(e), exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": "results_fetch_failed",
-                "message": "Failed to fetch results. Please try again.",
-                "correlation_id": correlation_id,
-                "signup_suggestion": "Sign up for priority support and guaranteed access!"
-            }
-        )
+    # Execute with retry - THIS IS WHERE THE OTHER 500 ERRORS WERE HAPPENING
+    response = await execute_with_retry(
+        service.get_blurred_results,
+        session_token,
+        correlation_id=correlation_id,
+        max_retries=2
+    )
+    
+    log.info("Results retrieved successfully", is_blurred=response.is_blurred)
+    return _model_response(response)
 
 
 @router.post("/{session_token}/claim", response_model=ClaimSessionResponse)
+@handled("claim_failed", "Failed to claim session. Please try again.", "Session claim failed")
 async def claim_anonymous_session(
     session_token: str,
     request_data: ClaimSessionRequest = ClaimSessionRequest(),
-    current_user: UserPrincipal = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user),
+    service: "AnonymousService" = Depends(get_service),
+    *,
+    correlation_id: str
 ):
     """Claim session with enhanced error handling."""
-    correlation_id = str(uuid.uuid4())
     user_id = current_user.user_id
     
-    logger.info("Claim session request", correlation_id=correlation_id, session_token=session_token[:16] + "...", user_id=user_id)
+    log = logger.bind(correlation_id=correlation_id)
+    log.opt(lazy=True).info(
+        "Claim session request",
+        session_token=lambda: session_token[:16] + "...",
+        user_id=lambda: user_id
+    )
     
-    try:
-        # Get service and execute with retry
-        service = await get_anonymous_service_with_retry()
-        response = await execute_with_retry(
-            service.claim_session_for_user,
-            session_token, user_id,
-            max_retries=1  # Lower retries for claim to avoid duplicate claims
-        )
-        
-        logger.info("Session claimed successfully", correlation_id=correlation_id, user_id=user_id)
-        return response
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Session claim failed", correlation_id=correlation_id, error=str(e), exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": "claim_failed",
-                "message": "Failed to claim session. Please try again.",
-                "correlation_id": correlation_id
-            }
-        )
+    response = await execute_with_retry(
+        service.claim_session_for_user,
+        session_token, user_id,
+        correlation_id=correlation_id,
+        max_retries=1  # Lower retries for claim to avoid duplicate claims
+    )
+    
+    log.info("Session claimed successfully", user_id=user_id)
+    return response
@@ -3,11 +3,17 @@ Simple Anonymous Upload API Endpoints (without transcription dependencies)
 For testing API structure while resolving Python 3.13 compatibility issues
 """
 
+import time
 import uuid
+from dataclasses import dataclass
+from secrets import token_bytes
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 
+import orjson
+from cachetools import TTLCache
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import Response
 from pydantic import BaseModel
 
 # Simple response models without transcription dependencies
@@ -43,8 +49,61 @@ class SimpleAnonymousResultResponse(BaseModel):
 # Create router
 router = APIRouter(prefix="/anonymous", tags=["anonymous"])
 
-# In-memory storage for demo (replace with database in production)
-demo_sessions = {}
+SESSION_TTL_SECONDS = 7 * 24 * 3600
+DEMO_PROCESSING_SECONDS = 30
+
+# In-memory storage for demo (replace with database in production).
+# Bounded and expiring so abandoned sessions don't accumulate forever.
+demo_sessions = TTLCache(maxsize=100_000, ttl=SESSION_TTL_SECONDS)
+
+DEMO_TOKEN_PREFIX = "demo_session_"
+
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(slots=True)
+class _DemoSession:
+    """Cached demo session. Slotted to keep the per-session footprint small;
+    times are epoch floats, converted only for responses."""
+    project_id: str
+    file_name: str
+    file_size: int
+    name: str
+    description: Optional[str]
+    language: Optional[str]
+    status: str
+    created_at: float
+    ready_at: float
+    expires_at: float
+
+
+def _session_key(session_token: str) -> Optional[bytes]:
+    """Cache key for a demo token: its 16 random bytes rather than the 45-char string.
+    Returns None for anything that isn't a well-formed demo token."""
+    if not session_token.startswith(DEMO_TOKEN_PREFIX):
+        return None
+    try:
+        key = bytes.fromhex(session_token[len(DEMO_TOKEN_PREFIX):])
+    except ValueError:
+        return None
+    return key if len(key) == 16 else None
+
+
+def _demo_status(session: _DemoSession, now: float) -> str:
+    """Demo sessions report completed once their simulated processing time has passed."""
+    return "completed" if now >= session.ready_at else session.status
+
+
+def _demo_content(file_name: str) -> str:
+    """Placeholder transcription, derived on demand rather than stored per session."""
+    return f"This is a demo transcription for the file '{file_name}'. In the real implementation, this would contain the actual transcribed content from your audio file. The transcription would be processed using advanced AI models to convert speech to text with high accuracy."
+
+
+def _utc(ts: float) -> datetime:
+    """Convert a stored epoch timestamp to an aware UTC datetime for responses."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
 
 @router.post("/upload", response_model=SimpleAnonymousUploadResponse)
 async def upload_file_anonymously(
@@ -69,13 +128,14 @@ async def upload_file_anonymously(
                 }
             )
         
-        # Read file content for size validation
-        file_content = await file.read()
-        file_size = len(file_content)
+        # Count bytes in chunks; reject as soon as the 10MB anonymous limit is passed
+        file_size = 0
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > MAX_UPLOAD_SIZE:
+                break
         
-        # Check file size (10MB limit for anonymous)
-        max_size = 10 * 1024 * 1024
-        if file_size > max_size:
+        if file_size > MAX_UPLOAD_SIZE:
             raise HTTPException(
                 status_code=413,
                 detail={
@@ -90,23 +150,25 @@ async def upload_file_anonymously(
             )
         
         # Generate session token and project ID
-        session_token = f"demo_session_{uuid.uuid4().hex}"
+        session_key = token_bytes(16)
+        session_token = DEMO_TOKEN_PREFIX + session_key.hex()
         project_id = str(uuid.uuid4())
         
         # Store session info (demo)
-        expires_at = datetime.utcnow() + timedelta(days=7)
-        demo_sessions[session_token] = {
-            "project_id": project_id,
-            "file_name": file.filename,
-            "file_size": file_size,
-            "name": name,
-            "description": description,
-            "language": language,
-            "status": "processing",
-            "created_at": datetime.utcnow(),
-            "expires_at": expires_at,
-            "demo_content": f"This is a demo transcription for the file '{file.filename}'. In the real implementation, this would contain the actual transcribed content from your audio file. The transcription would be processed using advanced AI models to convert speech to text with high accuracy."
-        }
+        created_at = time.time()
+        expires_at = created_at + SESSION_TTL_SECONDS
+        demo_sessions[session_key] = _DemoSession(
+            project_id=project_id,
+            file_name=file.filename,
+            file_size=file_size,
+            name=name,
+            description=description,
+            language=language,
+            status="processing",
+            created_at=created_at,
+            ready_at=created_at + DEMO_PROCESSING_SECONDS,
+            expires_at=expires_at,
+        )
         
         return SimpleAnonymousUploadResponse(
             session_token=session_token,
@@ -115,7 +177,7 @@ async def upload_file_anonymously(
             file_size=file_size,
             status="processing",
             estimated_time_seconds=30,
-            expires_at=expires_at,
+            expires_at=_utc(expires_at),
             message="Demo upload successful. In production, this would start real transcription processing."
         )
         
@@ -135,7 +197,8 @@ async def upload_file_anonymously(
 async def get_session_status(session_token: str):
     """Demo status check endpoint."""
     
-    if session_token not in demo_sessions:
+    session = demo_sessions.get(_session_key(session_token))
+    if session is None:
         raise HTTPException(
             status_code=404,
             detail={
@@ -145,29 +208,26 @@ async def get_session_status(session_token: str):
             }
         )
     
-    session = demo_sessions[session_token]
-    
-    # Simulate processing completion after 30 seconds
-    elapsed = (datetime.utcnow() - session["created_at"]).total_seconds()
-    if elapsed > 30:
-        session["status"] = "completed"
+    now = time.time()
+    status = _demo_status(session, now)
     
     return SimpleAnonymousStatusResponse(
         session_token=session_token,
-        status=session["status"],
-        file_name=session["file_name"],
-        file_size=session["file_size"],
-        created_at=session["created_at"],
-        expires_at=session["expires_at"],
-        is_expired=datetime.utcnow() > session["expires_at"],
-        message=f"Demo status: {session['status']}. Real implementation would show actual processing progress."
+        status=status,
+        file_name=session.file_name,
+        file_size=session.file_size,
+        created_at=_utc(session.created_at),
+        expires_at=_utc(session.expires_at),
+        is_expired=now > session.expires_at,
+        message=f"Demo status: {status}. Real implementation would show actual processing progress."
     )
 
 @router.get("/{session_token}", response_model=SimpleAnonymousResultResponse)
 async def get_transcription_results(session_token: str):
     """Demo blurred results endpoint."""
     
-    if session_token not in demo_sessions:
+    session = demo_sessions.get(_session_key(session_token))
+    if session is None:
         raise HTTPException(
             status_code=404,
             detail={
@@ -177,9 +237,7 @@ async def get_transcription_results(session_token: str):
             }
         )
     
-    session = demo_sessions[session_token]
-    
-    if session["status"] != "completed":
+    if _demo_status(session, time.time()) != "completed":
         raise HTTPException(
             status_code=202,
             detail={
@@ -190,7 +248,7 @@ async def get_transcription_results(session_token: str):
         )
     
     # Create blurred preview
-    full_content = session["demo_content"]
+    full_content = _demo_content(session.file_name)
     preview = full_content[:150] + "..."
     
     return SimpleAnonymousResultResponse(
@@ -198,32 +256,46 @@ async def get_transcription_results(session_token: str):
         status="completed",
         is_blurred=True,
         signup_required=True,
-        expires_at=session["expires_at"],
+        expires_at=_utc(session.expires_at),
         conversion_message=f"Your demo transcription is ready! Sign up free to view the complete content and unlock powerful repurposing features!",
         demo_preview=preview
     )
 
+# Demo payloads are constant apart from the reset stamps, so build them once
+_HEALTH_JSON = orjson.dumps({
+    "status": "healthy",
+    "service": "anonymous_upload_demo",
+    "message": "Demo version - transcription dependencies disabled due to Python 3.13 compatibility",
+    "python_version": "3.13",
+    "note": "This is a simplified version for testing API structure"
+})
+
+_RATE_LIMIT_STATIC = {
+    "uploads_used_hour": 1,
+    "uploads_used_day": 2,
+    "uploads_remaining_hour": 2,
+    "uploads_remaining_day": 3,
+    "is_limited": False,
+    "demo_mode": True
+}
+
+
+def _iso_in(seconds: float, now: float) -> str:
+    """UTC ISO-8601 timestamp `seconds` after the epoch time `now`."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now + seconds))
+
+
 @router.get("/health")
 async def anonymous_service_health():
     """Demo health check."""
-    return {
-        "status": "healthy",
-        "service": "anonymous_upload_demo",
-        "message": "Demo version - transcription dependencies disabled due to Python 3.13 compatibility",
-        "python_version": "3.13",
-        "note": "This is a simplified version for testing API structure"
-    }
+    return Response(content=_HEALTH_JSON, media_type="application/json")
 
 @router.get("/rate-limit")
 async def get_rate_limit_info():
     """Demo rate limit info."""
+    now = time.time()
     return {
-        "uploads_used_hour": 1,
-        "uploads_used_day": 2,
-        "uploads_remaining_hour": 2,
-        "uploads_remaining_day": 3,
-        "reset_time_hour": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
-        "reset_time_day": (datetime.utcnow() + timedelta(days=1)).isoformat(),
-        "is_limited": False,
-        "demo_mode": True
+        **_RATE_LIMIT_STATIC,
+        "reset_time_hour": _iso_in(3600, now),
+        "reset_time_day": _iso_in(86400, now)
     }
\ No newline at end of file
@@ -31,9 +31,12 @@ async def auth_webhook(request: Request):
         return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"received": True, "verified": False})
 
     try:
-        from svix import Webhook, WebhookVerificationError
+        # Built once in the app lifespan; constructed here only if startup didn't
+        wh = getattr(request.app.state, "svix_wh", None)
+        if wh is None:
+            from svix import Webhook
 
-        wh = Webhook(secret)
+            wh = request.app.state.svix_wh = Webhook(secret)
         event = wh.verify(payload, headers)  # type: ignore[arg-type]
         # TODO: persist event and sync user data in DB as needed
         return {"received": True, "verified": True, "type": event.get("type")}
@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from app.core.security import get_current_user, UserPrincipal
 
 router = APIRouter(prefix="/billing", tags=["billing"])  # placeholders
 
 
+PLANS = [
+    {"id": "free", "price": 0, "features": ["3 uploads/month", "basic text only"]},
+    {"id": "pro", "price": 29, "features": ["more uploads", "video clipping", "subtitles"]},
+    {"id": "agency", "price": 99, "features": ["unlimited", "multi-user", "white-label"]},
+]
+
+# Plans are static, so serialize once at import instead of on every hit
+_PLANS_JSON = json.dumps(PLANS, separators=(",", ":")).encode()
+
+
 @router.get("/plans")
 async def get_plans():
     """Return available plans (static for now)."""
-    return [
-        {"id": "free", "price": 0, "features": ["3 uploads/month", "basic text only"]},
-        {"id": "pro", "price": 29, "features": ["more uploads", "video clipping", "subtitles"]},
-        {"id": "agency", "price": 99, "features": ["unlimited", "multi-user", "white-label"]},
-    ]
+    return Response(
+        content=_PLANS_JSON,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
 
 
 @router.post("/subscribe")
@@ -1,17 +1,66 @@
-from typing import Optional
+import asyncio
+import os
+import tempfile
+from typing import Optional, Tuple
 from uuid import uuid4
-from fastapi import APIRouter, Depends, File, HTTPException, Path, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Path, Query, UploadFile
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
 from app.core.security import get_current_user, UserPrincipal
 from app.core.config import settings
-from app.api.deps import get_supabase
+from app.api.deps import get_supabase, response_data, ResourceId
 
 router = APIRouter(prefix="/projects", tags=["files"])  # shares /projects prefix
 
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+# Uploads are copied to disk in bounded chunks instead of read whole into memory
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Public URLs are deterministic, so build them locally instead of asking the SDK
+PUBLIC_URL_PREFIX = f"{(settings.SUPABASE_URL or '').rstrip('/')}/storage/v1/object/public/{settings.SUPABASE_BUCKET_UPLOADS}/"
+
+FILE_COLUMNS = "id,project_id,path,mime_type,size_bytes,public_url,created_at"
+
+# Supabase Storage removes at most this many objects per request
+STORAGE_REMOVE_BATCH = 1000
+
+
+async def remove_uploads(supabase, paths: list[str]) -> None:
+    """Remove objects from the uploads bucket, STORAGE_REMOVE_BATCH keys per call."""
+    storage = supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS)
+    for i in range(0, len(paths), STORAGE_REMOVE_BATCH):
+        await asyncio.to_thread(storage.remove, paths[i:i + STORAGE_REMOVE_BATCH])
+
+
+class BatchDeleteRequest(BaseModel):
+    ids: list[str] = Field(..., min_length=1)
+
+
+def _object_name(user_id: str, project_id: str, filename: Optional[str]) -> str:
+    """Storage key {user_id}/{project_id}/{uuid}.{ext}; files without an extension get .bin."""
+    _, dot, ext = (filename or "").rpartition(".")
+    return f"{user_id}/{project_id}/{uuid4().hex}.{ext.lower() if dot else 'bin'}"
+
+
+async def _spool_upload(file: UploadFile) -> Tuple[str, int]:
+    """Copy an upload to a temp file chunk by chunk. Returns (path, size_bytes)."""
+    spool = tempfile.NamedTemporaryFile(delete=False)
+    size_bytes = 0
+    try:
+        with spool:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size_bytes += len(chunk)
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(spool.name)
+        raise
+    return spool.name, size_bytes
+
 
 @router.post("/{project_id}/upload")
 async def upload_file(
-    project_id: str,
+    project_id: ResourceId,
     file: UploadFile = File(...),
     user: UserPrincipal = Depends(get_current_user),
     supabase=Depends(get_supabase),
@@ -22,73 +71,89 @@ async def upload_file(
     if not supabase or not settings.SUPABASE_URL:
         raise HTTPException(status_code=503, detail="Storage not configured")
 
-    content = await file.read()
-    ext = (file.filename or "").split(".")[-1].lower() if file.filename else "bin"
-    object_name = f"{user.user_id}/{project_id}/{uuid4()}.{ext}"
+    object_name = _object_name(user.user_id, project_id, file.filename)
 
+    spool_path: Optional[str] = None
     try:
+        spool_path, size_bytes = await _spool_upload(file)
         bucket = settings.SUPABASE_BUCKET_UPLOADS
         storage = supabase.storage.from_(bucket)
-        storage.upload(object_name, content, {
-            "contentType": file.content_type or "application/octet-stream",
-            "upsert": False,
-        })
-        public_url = storage.get_public_url(object_name)
+        # An open file is streamed by the storage client rather than buffered
+        with open(spool_path, "rb") as file_obj:
+            await asyncio.to_thread(storage.upload, object_name, file_obj, {
+                "content-type": file.content_type or DEFAULT_CONTENT_TYPE,
+                "x-upsert": "false",
+            })
+        public_url = PUBLIC_URL_PREFIX + object_name
 
         # Optional: record in DB
         try:
-            supabase.table("files").insert({
+            await asyncio.to_thread(supabase.table("files").insert({
                 "id": str(uuid4()),
                 "user_id": user.user_id,
                 "project_id": project_id,
                 "path": object_name,
                 "mime_type": file.content_type,
-                "size_bytes": len(content),
-                "public_url": public_url.get("data", {}).get("publicUrl") if isinstance(public_url, dict) else public_url,
-            }).execute()
+                "size_bytes": size_bytes,
+                "public_url": public_url,
+            }).execute)
         except Exception:
             pass
 
         return {
             "path": object_name,
             "bucket": bucket,
-            "public_url": public_url.get("data", {}).get("publicUrl") if isinstance(public_url, dict) else public_url,
+            "public_url": public_url,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    finally:
+        if spool_path:
+            os.unlink(spool_path)
 
 
 @router.get("/{project_id}/files")
-async def list_files(project_id: str, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def list_files(
+    project_id: ResourceId,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase),
+):
     if not supabase:
         return []
     try:
         # Prefer DB if available
         try:
-            res = supabase.table("files").select("*").eq("user_id", user.user_id).eq("project_id", project_id).execute()
-            data = res.data if hasattr(res, "data") else res.get("data") or []
+            res = await asyncio.to_thread(
+                supabase.table("files").select(FILE_COLUMNS)
+                .eq("user_id", user.user_id).eq("project_id", project_id)
+                .order("created_at", desc=True).range(offset, offset + limit - 1)
+                .execute
+            )
+            data = response_data(res)
             if data:
-                return data
+                return ORJSONResponse(data)
         except Exception:
             pass
         # Fallback to storage listing
         storage = supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS)
-        listing = storage.list(path=f"{user.user_id}/{project_id}")
-        return listing if listing else []
+        listing = await asyncio.to_thread(storage.list, path=f"{user.user_id}/{project_id}", options={"limit": limit, "offset": offset})
+        return ORJSONResponse(listing or [])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"List failed: {e}")
 
 
 @router.delete("/{project_id}/files/{file_id}", status_code=204)
-async def delete_file(project_id: str, file_id: str, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def delete_file(project_id: ResourceId, file_id: str, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
     if not supabase:
         return
     try:
         # file_id is expected to be a record id in DB; try DB first
         path_value: Optional[str] = None
         try:
-            res = supabase.table("files").select("path").eq("id", file_id).eq("user_id", user.user_id).eq("project_id", project_id).execute()
-            data = res.data if hasattr(res, "data") else res.get("data") or []
+            res = await asyncio.to_thread(supabase.table("files").select("path").eq("id", file_id).eq("user_id", user.user_id).eq("project_id", project_id).execute)
+            data = response_data(res)
             if data:
                 path_value = data[0].get("path")
         except Exception:
@@ -98,12 +163,37 @@ async def delete_file(project_id: str, file_id: str, user: UserPrincipal = Depen
             # If not found, assume file_id is the path itself
             path_value = file_id
 
-        supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS).remove([path_value])
-        try:
-            supabase.table("files").delete().eq("id", file_id).eq("user_id", user.user_id).eq("project_id", project_id).execute()
-        except Exception:
-            pass
+        # The object and its row are independent, so remove both concurrently;
+        # only a storage failure fails the request
+        removed, _ = await asyncio.gather(
+            asyncio.to_thread(supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS).remove, [path_value]),
+            asyncio.to_thread(supabase.table("files").delete().eq("id", file_id).eq("user_id", user.user_id).eq("project_id", project_id).execute),
+            return_exceptions=True,
+        )
+        if isinstance(removed, BaseException):
+            raise removed
         return
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Delete failed: {e}")
 
+
+
+@router.post("/{project_id}/files:batchDelete", status_code=204)
+async def batch_delete_files(
+    project_id: ResourceId,
+    body: BatchDeleteRequest,
+    user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase),
+):
+    """Delete several files with one lookup, one storage call per 1000 objects and one DB delete."""
+    if not supabase:
+        return
+    try:
+        res = await asyncio.to_thread(supabase.table("files").select("id,path").in_("id", body.ids).eq("user_id", user.user_id).eq("project_id", project_id).execute)
+        paths = [row["path"] for row in response_data(res) if row.get("path")]
+        await remove_uploads(supabase, paths)
+
+        await asyncio.to_thread(supabase.table("files").delete().in_("id", body.ids).eq("user_id", user.user_id).eq("project_id", project_id).execute)
+        return
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch delete failed: {e}")
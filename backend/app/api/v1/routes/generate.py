@@ -1,70 +1,89 @@
-from typing import Optional
+import asyncio
+import hashlib
+from typing import Literal, Optional
 from uuid import uuid4
+import orjson
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from app.core.security import get_current_user, UserPrincipal
-from app.api.deps import get_supabase
+from app.api.deps import get_supabase, ResourceId
 
 router = APIRouter(prefix="/projects", tags=["generate"])
 
+OutputKind = Literal["blog", "social", "email"]
+
+# Identical generate requests within this window (e.g. double clicks) return the
+# already-queued job instead of inserting a duplicate output. Per process.
+DEDUP_WINDOW_SECONDS = 60
+_recent_jobs: TTLCache = TTLCache(maxsize=10_000, ttl=DEDUP_WINDOW_SECONDS)
+
 
 class GenerateRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     topic: Optional[str] = None
     prompt_overrides: Optional[str] = None
     tone_of_voice: Optional[str] = None
     extras: dict = Field(default_factory=dict)
 
 
-@router.post("/{project_id}/generate/blog", status_code=202)
-async def generate_blog(project_id: str, body: GenerateRequest, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
-    output_id = str(uuid4())
-    if supabase:
-        try:
-            supabase.table("outputs").insert({
-                "id": output_id,
-                "user_id": user.user_id,
-                "project_id": project_id,
-                "kind": "blog",
-                "status": "queued",
-                "request": body.model_dump(),
-            }).execute()
-        except Exception:
-            pass
-    return {"job_id": output_id, "status": "queued"}
+class GenerateItem(GenerateRequest):
+    kind: OutputKind
 
 
-@router.post("/{project_id}/generate/social", status_code=202)
-async def generate_social(project_id: str, body: GenerateRequest, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
-    output_id = str(uuid4())
-    if supabase:
+def _queued_output(project_id: str, user_id: str, kind: str, request: dict) -> dict:
+    return {
+        "id": str(uuid4()),
+        "user_id": user_id,
+        "project_id": project_id,
+        "kind": kind,
+        "status": "queued",
+        "request": request,
+    }
+
+
+def _dedup_key(row: dict) -> str:
+    """Stable key for a logical job: owner, project, kind and canonical request."""
+    request = orjson.dumps(row["request"], option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha1(f'{row["user_id"]}:{row["project_id"]}:{row["kind"]}:'.encode() + request).hexdigest()
+
+
+@router.post("/{project_id}/generate:batch", status_code=202)
+async def generate_batch(project_id: ResourceId, items: list[GenerateItem], user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+    """Queue several outputs for one project with a single insert."""
+    if not items:
+        raise HTTPException(status_code=422, detail="At least one item is required")
+    rows = [_queued_output(project_id, user.user_id, item.kind, item.model_dump(exclude={"kind"})) for item in items]
+    new_rows = []
+    for row in rows:
+        key = _dedup_key(row)
+        if key in _recent_jobs:
+            row["id"] = _recent_jobs[key]
+        else:
+            _recent_jobs[key] = row["id"]
+            new_rows.append(row)
+    if supabase and new_rows:
         try:
-            supabase.table("outputs").insert({
-                "id": output_id,
-                "user_id": user.user_id,
-                "project_id": project_id,
-                "kind": "social",
-                "status": "queued",
-                "request": body.model_dump(),
-            }).execute()
+            await asyncio.to_thread(supabase.table("outputs").insert(new_rows).execute)
         except Exception:
-            pass
-    return {"job_id": output_id, "status": "queued"}
+            # Nothing was queued, so let a retry insert these rather than reuse dead ids
+            for row in new_rows:
+                _recent_jobs.pop(_dedup_key(row), None)
+    return [{"job_id": row["id"], "kind": row["kind"], "status": "queued"} for row in rows]
 
 
-@router.post("/{project_id}/generate/email", status_code=202)
-async def generate_email(project_id: str, body: GenerateRequest, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
-    output_id = str(uuid4())
+@router.post("/{project_id}/generate/{kind}", status_code=202)
+async def generate(project_id: ResourceId, kind: OutputKind, body: GenerateRequest, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+    # Dumped once; the same dict feeds the dedup key and the insert
+    row = _queued_output(project_id, user.user_id, kind, body.model_dump())
+    key = _dedup_key(row)
+    if key in _recent_jobs:
+        return {"job_id": _recent_jobs[key], "status": "queued"}
+    _recent_jobs[key] = row["id"]
     if supabase:
         try:
-            supabase.table("outputs").insert({
-                "id": output_id,
-                "user_id": user.user_id,
-                "project_id": project_id,
-                "kind": "email",
-                "status": "queued",
-                "request": body.model_dump(),
-            }).execute()
+            await asyncio.to_thread(supabase.table("outputs").insert(row).execute)
         except Exception:
-            pass
-    return {"job_id": output_id, "status": "queued"}
-
+            _recent_jobs.pop(key, None)
+    return {"job_id": row["id"], "status": "queued"}
@@ -1,11 +1,16 @@
+import asyncio
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from app.core.security import get_current_user, UserPrincipal
-from app.api.deps import get_supabase
+from app.api.deps import get_pg_pool, get_supabase, response_data, ResourceId
 
 router = APIRouter(prefix="/projects", tags=["outputs"])
 
+OUTPUT_LIST_COLUMNS = "id,project_id,kind,status,body,metadata,created_at,updated_at"
+LIST_OUTPUTS_SQL = f"SELECT {OUTPUT_LIST_COLUMNS} FROM public.outputs WHERE project_id = $1 AND user_id = $2 ORDER BY created_at DESC LIMIT $3 OFFSET $4"
+
 
 class Output(BaseModel):
     id: str
@@ -22,52 +27,75 @@ class OutputUpdate(BaseModel):
 
 
 @router.get("/{project_id}/outputs")
-async def list_outputs(project_id: str, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def list_outputs(
+    project_id: ResourceId,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase),
+):
+    pool = await get_pg_pool()
+    if pool:
+        try:
+            rows = await pool.fetch(LIST_OUTPUTS_SQL, project_id, user.user_id, limit, offset)
+            return ORJSONResponse([dict(row) for row in rows])
+        except Exception:
+            pass  # fall back to PostgREST
     if not supabase:
         return []
     try:
-        res = supabase.table("outputs").select("*").eq("project_id", project_id).eq("user_id", user.user_id).execute()
-        data = res.data if hasattr(res, "data") else res.get("data") or []
-        return data
+        res = await asyncio.to_thread(
+            supabase.table("outputs").select(OUTPUT_LIST_COLUMNS)
+            .eq("project_id", project_id).eq("user_id", user.user_id)
+            .order("created_at", desc=True).range(offset, offset + limit - 1)
+            .execute
+        )
+        return ORJSONResponse(response_data(res))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list outputs: {e}")
 
 
 @router.get("/{project_id}/outputs/{output_id}")
-async def get_output(project_id: str, output_id: str, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def get_output(project_id: ResourceId, output_id: ResourceId, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
     if not supabase:
         raise HTTPException(status_code=404, detail="Output not found")
     try:
-        res = supabase.table("outputs").select("*").eq("id", output_id).eq("project_id", project_id).eq("user_id", user.user_id).execute()
-        data = res.data if hasattr(res, "data") else res.get("data") or []
+        res = await asyncio.to_thread(supabase.table("outputs").select("*").eq("id", output_id).eq("project_id", project_id).eq("user_id", user.user_id).execute)
+        data = response_data(res)
         if not data:
             raise HTTPException(status_code=404, detail="Output not found")
         return data[0]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch output: {e}")
 
 
 @router.patch("/{project_id}/outputs/{output_id}")
-async def update_output(project_id: str, output_id: str, update: OutputUpdate, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def update_output(project_id: ResourceId, output_id: ResourceId, update: OutputUpdate, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
     if not supabase:
         raise HTTPException(status_code=404, detail="Output not found")
     try:
         payload = {k: v for k, v in update.model_dump(exclude_none=True).items()}
-        res = supabase.table("outputs").update(payload).eq("id", output_id).eq("project_id", project_id).eq("user_id", user.user_id).execute()
-        data = res.data if hasattr(res, "data") else res.get("data") or []
+        # One round trip: PostgREST returns the updated row (return=representation),
+        # so an empty result means no row matched and there is no need to SELECT first
+        res = await asyncio.to_thread(supabase.table("outputs").update(payload).eq("id", output_id).eq("project_id", project_id).eq("user_id", user.user_id).execute)
+        data = response_data(res)
         if not data:
             raise HTTPException(status_code=404, detail="Output not found")
         return data[0]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update output: {e}")
 
 
 @router.delete("/{project_id}/outputs/{output_id}", status_code=204)
-async def delete_output(project_id: str, output_id: str, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def delete_output(project_id: ResourceId, output_id: ResourceId, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
     if not supabase:
         return
     try:
-        supabase.table("outputs").delete().eq("id", output_id).eq("project_id", project_id).eq("user_id", user.user_id).execute()
+        await asyncio.to_thread(supabase.table("outputs").delete().eq("id", output_id).eq("project_id", project_id).eq("user_id", user.user_id).execute)
         return
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete output: {e}")
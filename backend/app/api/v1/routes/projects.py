@@ -1,13 +1,25 @@
+import asyncio
 from datetime import datetime
 from typing import Optional
 from uuid import uuid4
-from fastapi import APIRouter, Depends, HTTPException, Path
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from loguru import logger
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from app.core.config import settings
 from app.core.security import get_current_user, UserPrincipal
-from app.api.deps import get_supabase
+from app.api.deps import get_pg_pool, get_supabase, response_data, ResourceId
+from app.api.v1.routes.files import remove_uploads
+from app.utils.http import etag_response
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+PROJECT_COLUMNS = "id,user_id,title,description,created_at,updated_at"
+
+# Direct-Postgres versions of the hot reads, used when a pool is configured
+LIST_PROJECTS_SQL = f"SELECT {PROJECT_COLUMNS} FROM public.projects WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2 OFFSET $3"
+GET_PROJECT_SQL = f"SELECT {PROJECT_COLUMNS} FROM public.projects WHERE id = $1 AND user_id = $2"
+
 
 class ProjectCreate(BaseModel):
     title: str
@@ -28,9 +40,13 @@ class Project(BaseModel):
     updated_at: datetime
 
 
+# Validates a whole page of rows in one call into pydantic-core
+PROJECT_LIST_ADAPTER = TypeAdapter(list[Project])
+
+
 @router.post("/", response_model=Project)
 async def create_project(payload: ProjectCreate, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
-    now = datetime.utcnow()
+    now = datetime.utcnow().isoformat()
     project = {
         "id": str(uuid4()),
         "user_id": user.user_id,
@@ -41,10 +57,11 @@ async def create_project(payload: ProjectCreate, user: UserPrincipal = Depends(g
     }
     if supabase:
         try:
-            res = supabase.table("projects").insert(project).execute()
-            data = res.data if hasattr(res, "data") else res.get("data")
+            # The insert returns the stored row (return=representation); send it as-is
+            res = await asyncio.to_thread(supabase.table("projects").insert(project).execute)
+            data = response_data(res)
             if data:
-                project = data[0]
+                return ORJSONResponse(data[0])
         except Exception as e:
             # fall back to returning the generated object
             pass
@@ -52,51 +69,98 @@ async def create_project(payload: ProjectCreate, user: UserPrincipal = Depends(g
 
 
 @router.get("/", response_model=list[Project])
-async def list_projects(user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def list_projects(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase),
+):
+    pool = await get_pg_pool()
+    if pool:
+        try:
+            rows = await pool.fetch(LIST_PROJECTS_SQL, user.user_id, limit, offset)
+            return ORJSONResponse([dict(row) for row in rows])
+        except Exception:
+            pass  # fall back to PostgREST
     if supabase:
         try:
-            res = supabase.table("projects").select("*").eq("user_id", user.user_id).order("created_at", desc=True).execute()
-            data = res.data if hasattr(res, "data") else res.get("data") or []
-            # Pydantic will coerce datetime strings
-            return [Project(**row) for row in data]
+            res = await asyncio.to_thread(
+                supabase.table("projects").select(PROJECT_COLUMNS)
+                .eq("user_id", user.user_id).order("created_at", desc=True)
+                .range(offset, offset + limit - 1)
+                .execute
+            )
+            data = response_data(res)
+            # Rows are already Project-shaped (see PROJECT_COLUMNS), so production skips
+            # the model round trip; debug builds still validate to catch schema drift
+            if settings.API_DEBUG:
+                PROJECT_LIST_ADAPTER.validate_python(data)
+            return ORJSONResponse(data)
+        except ValidationError:
+            raise
         except Exception:
             pass
     return []
 
 
 @router.get("/{project_id}", response_model=Project)
-async def get_project(project_id: str = Path(...), user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def get_project(request: Request, project_id: ResourceId, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+    pool = await get_pg_pool()
+    if pool:
+        try:
+            row = await pool.fetchrow(GET_PROJECT_SQL, project_id, user.user_id)
+            if row:
+                return etag_response(request, dict(row))
+            raise HTTPException(status_code=404, detail="Project not found")
+        except HTTPException:
+            raise
+        except Exception:
+            pass  # fall back to PostgREST
     if supabase:
         try:
-            res = supabase.table("projects").select("*").eq("id", project_id).eq("user_id", user.user_id).execute()
-            data = res.data if hasattr(res, "data") else res.get("data") or []
+            res = await asyncio.to_thread(supabase.table("projects").select(PROJECT_COLUMNS).eq("id", project_id).eq("user_id", user.user_id).execute)
+            data = response_data(res)
             if data:
-                return Project(**data[0])
+                return etag_response(request, data[0])
         except Exception:
             pass
     raise HTTPException(status_code=404, detail="Project not found")
 
 
 @router.patch("/{project_id}", response_model=Project)
-async def update_project(payload: ProjectUpdate, project_id: str, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def update_project(payload: ProjectUpdate, project_id: ResourceId, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
     update = {k: v for k, v in payload.model_dump(exclude_none=True).items()}
-    update["updated_at"] = datetime.utcnow()
+    update["updated_at"] = datetime.utcnow().isoformat()
     if supabase:
         try:
-            res = supabase.table("projects").update(update).eq("id", project_id).eq("user_id", user.user_id).execute()
-            data = res.data if hasattr(res, "data") else res.get("data") or []
+            res = await asyncio.to_thread(supabase.table("projects").update(update).eq("id", project_id).eq("user_id", user.user_id).execute)
+            data = response_data(res)
             if data:
-                return Project(**data[0])
+                return ORJSONResponse(data[0])
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to update: {e}")
     raise HTTPException(status_code=404, detail="Project not found (no DB)")
 
 
 @router.delete("/{project_id}", status_code=204)
-async def delete_project(project_id: str, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+async def delete_project(project_id: ResourceId, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
     if supabase:
         try:
-            supabase.table("projects").delete().eq("id", project_id).eq("user_id", user.user_id).execute()
+            # Collect the storage paths before their files rows go away
+            res = await asyncio.to_thread(supabase.table("files").select("path").eq("project_id", project_id).eq("user_id", user.user_id).execute)
+            paths = [row["path"] for row in response_data(res) if row.get("path")]
+            # The migrations don't guarantee a cascade from projects, so remove the
+            # child rows explicitly; outputs and files don't reference each other
+            await asyncio.gather(
+                asyncio.to_thread(supabase.table("outputs").delete().eq("project_id", project_id).eq("user_id", user.user_id).execute),
+                asyncio.to_thread(supabase.table("files").delete().eq("project_id", project_id).eq("user_id", user.user_id).execute),
+            )
+            await asyncio.to_thread(supabase.table("projects").delete().eq("id", project_id).eq("user_id", user.user_id).execute)
+            # Objects go last, only once no row points at them any more
+            try:
+                await remove_uploads(supabase, paths)
+            except Exception as e:
+                logger.warning(f"Project {project_id} deleted but removing its uploads failed: {e}")
             return
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to delete: {e}")
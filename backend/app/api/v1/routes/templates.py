@@ -1,8 +1,11 @@
+import asyncio
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from app.core.security import get_current_user, UserPrincipal
-from app.api.deps import get_supabase
+from app.api.deps import get_supabase, response_data
+from app.utils.http import etag_response
 
 router = APIRouter(tags=["templates"])  # root-level endpoints
 
@@ -21,23 +24,30 @@ class TemplateCreate(BaseModel):
     prompt: str
 
 
-DEFAULT_TEMPLATES = [
+DEFAULT_TEMPLATES = (
     {"id": "blog_basic", "name": "Blog: Basic", "type": "blog", "prompt": "Write a structured blog post.", "is_custom": False},
     {"id": "linkedin_insight", "name": "LinkedIn: Insight", "type": "linkedin", "prompt": "Write a professional LinkedIn post with a hook and insights.", "is_custom": False},
     {"id": "twitter_thread", "name": "Twitter/X Thread", "type": "twitter", "prompt": "Create a compelling X thread with 5-8 tweets.", "is_custom": False},
-]
+)
+
+# Per-user template lists; custom templates change rarely and writes below invalidate
+_templates_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
 
 
 @router.get("/templates")
-async def list_templates(user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
-    custom = []
+async def list_templates(request: Request, user: UserPrincipal = Depends(get_current_user), supabase=Depends(get_supabase)):
+    cached = _templates_cache.get(user.user_id)
+    if cached is not None:
+        return etag_response(request, cached)
+    templates = list(DEFAULT_TEMPLATES)
     if supabase:
         try:
-            res = supabase.table("templates").select("*").eq("user_id", user.user_id).execute()
-            custom = res.data if hasattr(res, "data") else res.get("data") or []
+            res = await asyncio.to_thread(supabase.table("templates").select("*").eq("user_id", user.user_id).execute)
+            templates.extend(response_data(res))
+            _templates_cache[user.user_id] = templates
         except Exception:
             pass
-    return DEFAULT_TEMPLATES + custom
+    return etag_response(request, templates)
 
 
 @router.post("/templates/custom")
@@ -48,15 +58,16 @@ async def create_custom_template(payload: TemplateCreate, user: UserPrincipal =
         from uuid import uuid4
 
         new_id = str(uuid4())
-        res = supabase.table("templates").insert({
+        res = await asyncio.to_thread(supabase.table("templates").insert({
             "id": new_id,
             "user_id": user.user_id,
             "name": payload.name,
             "type": payload.type,
             "prompt": payload.prompt,
             "is_custom": True,
-        }).execute()
-        data = res.data if hasattr(res, "data") else res.get("data") or []
+        }).execute)
+        _templates_cache.pop(user.user_id, None)
+        data = response_data(res)
         return data[0] if data else {"id": new_id, **payload.model_dump(), "is_custom": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create template: {e}")
@@ -67,7 +78,8 @@ async def delete_template(template_id: str, user: UserPrincipal = Depends(get_cu
     if not supabase:
         return
     try:
-        supabase.table("templates").delete().eq("id", template_id).eq("user_id", user.user_id).execute()
+        await asyncio.to_thread(supabase.table("templates").delete().eq("id", template_id).eq("user_id", user.user_id).execute)
+        _templates_cache.pop(user.user_id, None)
         return
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete template: {e}")
@@ -3,19 +3,23 @@ Project API Endpoints
 Handles project creation, file upload, and transcription
 """
 
+import asyncio
+import hashlib
 import os
+import tempfile
 import uuid
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Literal, Optional, List
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from fastapi.responses import JSONResponse
 from loguru import logger
+from pydantic import TypeAdapter
 
 from app.core.security import get_current_user, UserPrincipal
 from app.core.config import settings
-from app.api.deps import get_supabase_client
+from app.api.deps import get_supabase
 from app.models.project import (
     Project,
     ProjectCreate,
@@ -26,13 +30,88 @@ from app.models.project import (
     ProjectWithTranscription,
     UserUsageStats,
     ProjectStatus,
+    Transcription,
     TranscriptionStatus
 )
 from app.services.background_tasks import background_service
-from app.services.transcription.audio_utils import AudioProcessor
 
 router = APIRouter(prefix="/transcription", tags=["transcription"])
 
+# Uploads are copied to disk in bounded chunks instead of read whole into memory
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Validates a page of rows in one pydantic-core call instead of one per row
+PROJECT_LIST_ADAPTER = TypeAdapter(List[Project])
+
+# projects and transcriptions are linked both ways (transcriptions.project_id and
+# projects.transcription_id), so embeds must name the FK or PostgREST returns PGRST201.
+# This one is many-to-one, so the embed is a single object rather than a list.
+TRANSCRIPTION_EMBED = "transcriptions!projects_transcription_id_fkey"
+
+
+async def _spool_upload(file: UploadFile, max_size: int) -> tuple[str, int, str]:
+    """
+    Copy an upload to a temp file chunk by chunk, enforcing a size cap.
+    
+    The SHA-256 digest is taken afterwards with hashlib.file_digest in a
+    worker thread, so hashing runs in OpenSSL off the event loop while the
+    spooled file is still in the page cache.
+    
+    Args:
+        file: Incoming upload
+        max_size: Maximum allowed size in bytes
+        
+    Returns:
+        Tuple of (temp file path, size in bytes, hex SHA-256 digest)
+        
+    Raises:
+        HTTPException: 413 as soon as the upload exceeds max_size
+    """
+    spool = tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename or "").suffix)
+    size = 0
+    try:
+        with spool:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE_MB}MB"
+                    )
+                spool.write(chunk)
+        with open(spool.name, "rb") as spooled:
+            digest = await asyncio.to_thread(hashlib.file_digest, spooled, "sha256")
+    except BaseException:
+        os.unlink(spool.name)
+        raise
+    return spool.name, size, digest.hexdigest()
+
+
+async def _probe_duration(path: str) -> Optional[float]:
+    """
+    Read the media duration with a single ffprobe call.
+    
+    Args:
+        path: Local file path
+        
+    Returns:
+        Duration in seconds, or None if ffprobe is unavailable or fails
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await proc.communicate()
+        return float(stdout) if proc.returncode == 0 else None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not probe duration: {str(e)}")
+        return None
+
 
 def check_user_limits(user_id: str, supabase) -> UserUsageStats:
     """
@@ -52,24 +131,16 @@ def check_user_limits(user_id: str, supabase) -> UserUsageStats:
     now = datetime.utcnow()
     month_start = datetime(now.year, now.month, 1)
     
-    # Count projects this month
-    projects_response = supabase.table("projects").select("id, duration_seconds").eq(
-        "user_id", user_id
-    ).gte("created_at", month_start.isoformat()).execute()
+    # Counts and duration are aggregated server-side in one round trip
+    usage_response = supabase.rpc("user_usage_stats", {
+        "uid": user_id,
+        "month_start": month_start.isoformat(),
+    }).execute()
+    usage = usage_response.data[0] if usage_response.data else {}
     
-    projects_this_month = len(projects_response.data)
-    
-    # Calculate total duration
-    total_duration_seconds = sum(
-        p.get("duration_seconds", 0) or 0 for p in projects_response.data
-    )
-    total_duration_minutes = total_duration_seconds / 60
-    
-    # Get all-time project count
-    all_projects_response = supabase.table("projects").select("id").eq(
-        "user_id", user_id
-    ).execute()
-    total_projects = len(all_projects_response.data)
+    projects_this_month = usage.get("projects_this_month", 0)
+    total_duration_minutes = (usage.get("total_duration_seconds") or 0) / 60
+    total_projects = usage.get("total_projects", 0)
     
     stats = UserUsageStats(
         projects_this_month=projects_this_month,
@@ -96,7 +167,8 @@ async def upload_file(
     description: Optional[str] = Form(None),
     language: Optional[str] = Form(None),
     tags: Optional[str] = Form(None),
-    current_user: UserPrincipal = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase)
 ):
     """
     Upload an audio/video file and create a new project.
@@ -108,48 +180,65 @@ async def upload_file(
         language: Optional language code (ISO 639-1)
         tags: Optional comma-separated tags
         current_user: Current authenticated user
+        supabase: Shared Supabase client
         
     Returns:
         File upload response with project ID
     """
     user_id = current_user.user_id
-    supabase = get_supabase_client()
     
     try:
         # Check user limits
-        usage_stats = check_user_limits(user_id, supabase)
+        usage_stats = await asyncio.to_thread(check_user_limits, user_id, supabase)
         
         # Validate file extension
         file_ext = Path(file.filename).suffix.lower()
-        allowed_extensions = settings.ALLOWED_AUDIO_EXTENSIONS.split(",")
-        if file_ext not in allowed_extensions:
+        if file_ext not in settings.allowed_extensions_set:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
+                detail=f"Invalid file type. Allowed: {settings.ALLOWED_AUDIO_EXTENSIONS}"
             )
         
-        # Check file size
-        file_content = await file.read()
-        file_size = len(file_content)
+        # Stream to a temp file, rejecting oversize uploads before they are fully read
         max_size = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-        
-        if file_size > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE_MB}MB"
+        spool_path, file_size, file_sha256 = await _spool_upload(file, max_size)
+        
+        try:
+            # Same bytes already uploaded by this user: return that project
+            existing_response = await asyncio.to_thread(
+                supabase.table("projects").select("id, file_name, file_size, storage_path, file_url").eq(
+                    "user_id", user_id
+                ).eq("file_sha256", file_sha256).limit(1).execute
             )
-        
-        # Generate unique file path
-        project_id = str(uuid.uuid4())
-        storage_path = f"{user_id}/{project_id}/{file.filename}"
-        
-        # Upload to Supabase Storage
-        logger.info(f"Uploading file to Supabase: {storage_path}")
-        upload_response = supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS).upload(
-            storage_path,
-            file_content,
-            {"content-type": file.content_type}
-        )
+            if existing_response.data:
+                existing = existing_response.data[0]
+                return FileUploadResponse(
+                    project_id=existing["id"],
+                    file_name=existing["file_name"],
+                    file_size=existing["file_size"],
+                    storage_path=existing["storage_path"],
+                    upload_url=existing.get("file_url"),
+                    message="File already uploaded. Returning the existing project."
+                )
+            
+            # Probe duration once now so start_transcription's limit check has it
+            duration_seconds = await _probe_duration(spool_path)
+            
+            # Generate unique file path
+            project_id = str(uuid.uuid4())
+            storage_path = f"{user_id}/{project_id}/{file.filename}"
+            
+            # Upload to Supabase Storage; an open file is streamed rather than buffered
+            logger.info(f"Uploading file to Supabase: {storage_path}")
+            with open(spool_path, "rb") as file_obj:
+                await asyncio.to_thread(
+                    supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS).upload,
+                    storage_path,
+                    file_obj,
+                    {"content-type": file.content_type}
+                )
+        finally:
+            os.unlink(spool_path)
         
         # Get public URL (optional, if bucket is public)
         file_url = supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS).get_public_url(storage_path)
@@ -170,20 +259,24 @@ async def upload_file(
             "file_size": file_size,
             "file_url": file_url,
             "storage_path": storage_path,
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "file_sha256": file_sha256,
+            "duration_seconds": duration_seconds
         }
         
-        project_response = supabase.table("projects").insert(project_data).execute()
+        # Timestamps come from column defaults; the inserted row is returned
+        project_response = await asyncio.to_thread(
+            supabase.table("projects").insert(project_data).execute
+        )
         
-        logger.info(f"Created project {project_id} for user {user_id}")
+        project = project_response.data[0]
+        logger.info(f"Created project {project['id']} for user {user_id}")
         
         return FileUploadResponse(
-            project_id=project_id,
-            file_name=file.filename,
-            file_size=file_size,
-            storage_path=storage_path,
-            upload_url=file_url,
+            project_id=project["id"],
+            file_name=project["file_name"],
+            file_size=project["file_size"],
+            storage_path=project["storage_path"],
+            upload_url=project.get("file_url"),
             message="File uploaded successfully. Use /transcribe endpoint to start transcription."
         )
         
@@ -198,7 +291,8 @@ async def upload_file(
 async def start_transcription(
     project_id: str,
     language: Optional[str] = None,
-    current_user: UserPrincipal = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase)
 ):
     """
     Start transcription for a project.
@@ -207,62 +301,75 @@ async def start_transcription(
         project_id: Project ID
         language: Optional language code override
         current_user: Current authenticated user
+        supabase: Shared Supabase client
         
     Returns:
         Transcription job response
     """
-    user_id = current_user["sub"]
-    supabase = get_supabase_client()
+    user_id = current_user.user_id
     
     try:
-        # Get project
-        project_response = supabase.table("projects").select("*").eq(
-            "id", project_id
-        ).eq("user_id", user_id).execute()
-        
-        if not project_response.data:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        project = project_response.data[0]
-        
-        # Check if already transcribed or processing
-        if project.get("transcription_status") == TranscriptionStatus.PROCESSING.value:
-            raise HTTPException(status_code=400, detail="Transcription already in progress")
-        
-        if project.get("transcription_status") == TranscriptionStatus.COMPLETED.value:
-            raise HTTPException(status_code=400, detail="Project already transcribed")
+        # Ownership, status and duration checks plus the status flip happen in
+        # one atomic UPDATE ... RETURNING, so two requests cannot both start
+        claim_response = await asyncio.to_thread(
+            supabase.rpc("start_transcription", {
+                "pid": project_id,
+                "uid": user_id,
+                "max_minutes": settings.FREE_TIER_MAX_DURATION_MINUTES,
+            }).execute
+        )
         
-        # Check audio duration limit for free tier
-        if project.get("duration_seconds"):
-            duration_minutes = project["duration_seconds"] / 60
-            if duration_minutes > settings.FREE_TIER_MAX_DURATION_MINUTES:
+        if not claim_response.data:
+            # Only on failure: look the row up to explain why
+            project_response = await asyncio.to_thread(
+                supabase.table("projects").select("transcription_status, duration_seconds").eq(
+                    "id", project_id
+                ).eq("user_id", user_id).execute
+            )
+            if not project_response.data:
+                raise HTTPException(status_code=404, detail="Project not found")
+            
+            project = project_response.data[0]
+            status = project.get("transcription_status")
+            if status in (TranscriptionStatus.PENDING.value, TranscriptionStatus.PROCESSING.value):
+                raise HTTPException(status_code=409, detail="Transcription already in progress")
+            if status == TranscriptionStatus.COMPLETED.value:
+                raise HTTPException(status_code=400, detail="Project already transcribed")
+            duration_seconds = project.get("duration_seconds")
+            if duration_seconds is not None and float(duration_seconds) / 60 > settings.FREE_TIER_MAX_DURATION_MINUTES:
                 raise HTTPException(
                     status_code=403,
                     detail=f"Audio duration exceeds free tier limit ({settings.FREE_TIER_MAX_DURATION_MINUTES} minutes)"
                 )
+            # The row changed between the claim and this lookup
+            raise HTTPException(status_code=409, detail="Project state changed, please retry")
+        
+        project = claim_response.data[0]
         
         # Use project language if not overridden
         if not language:
             language = project.get("language")
         
         # Submit transcription task
-        task_id = background_service.submit_transcription_task(
-            project_id=project_id,
-            storage_path=project["storage_path"],
-            user_id=user_id,
-            language=language
-        )
+        try:
+            task_id = background_service.submit_transcription_task(
+                project_id=project_id,
+                storage_path=project["storage_path"],
+                user_id=user_id,
+                language=language
+            )
+        except Exception:
+            # Release the claim, otherwise the project stays pending and can never restart
+            await asyncio.to_thread(
+                supabase.table("projects").update({
+                    "transcription_status": TranscriptionStatus.FAILED.value
+                }).eq("id", project_id).eq("user_id", user_id).execute
+            )
+            raise
         
         # Estimate processing time (rough estimate)
-        audio_processor = AudioProcessor()
         estimated_time = 30  # Default estimate
         
-        # Update project status
-        supabase.table("projects").update({
-            "transcription_status": TranscriptionStatus.PENDING.value,
-            "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", project_id).execute()
-        
         return TranscriptionJobResponse(
             project_id=project_id,
             status=TranscriptionStatus.PENDING,
@@ -280,7 +387,8 @@ async def start_transcription(
 @router.get("/{project_id}", response_model=ProjectWithTranscription)
 async def get_project(
     project_id: str,
-    current_user: UserPrincipal = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase)
 ):
     """
     Get project details with transcription.
@@ -288,35 +396,28 @@ async def get_project(
     Args:
         project_id: Project ID
         current_user: Current authenticated user
+        supabase: Shared Supabase client
         
     Returns:
         Project with transcription data
     """
-    user_id = current_user["sub"]
-    supabase = get_supabase_client()
+    user_id = current_user.user_id
     
     try:
-        # Get project
-        project_response = supabase.table("projects").select("*").eq(
-            "id", project_id
-        ).eq("user_id", user_id).execute()
+        # Get project with its transcription embedded via the transcription_id FK
+        project_response = await asyncio.to_thread(
+            supabase.table("projects").select(
+                f"*, transcription:{TRANSCRIPTION_EMBED}(*)"
+            ).eq("id", project_id).eq("user_id", user_id).limit(1).execute
+        )
         
         if not project_response.data:
             raise HTTPException(status_code=404, detail="Project not found")
         
         project_data = project_response.data[0]
+        transcription_data = project_data.pop("transcription", None)
         project = Project(**project_data)
-        
-        # Get transcription if available
-        transcription = None
-        if project.transcription_id:
-            trans_response = supabase.table("transcriptions").select("*").eq(
-                "id", project.transcription_id
-            ).execute()
-            
-            if trans_response.data:
-                from app.models.project import Transcription
-                transcription = Transcription(**trans_response.data[0])
+        transcription = Transcription(**transcription_data) if transcription_data else None
         
         return ProjectWithTranscription(
             project=project,
@@ -335,7 +436,9 @@ async def list_projects(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     status: Optional[ProjectStatus] = None,
-    current_user: UserPrincipal = Depends(get_current_user)
+    expand: Optional[Literal["transcription"]] = None,
+    current_user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase)
 ):
     """
     List user's projects with pagination.
@@ -344,34 +447,34 @@ async def list_projects(
         page: Page number (1-based)
         per_page: Items per page
         status: Optional status filter
+        expand: Pass "transcription" to embed a transcription summary per project
         current_user: Current authenticated user
+        supabase: Shared Supabase client
         
     Returns:
         Paginated project list
     """
-    user_id = current_user["sub"]
-    supabase = get_supabase_client()
+    user_id = current_user.user_id
     
     try:
-        # Build query
-        query = supabase.table("projects").select("*").eq("user_id", user_id)
+        # Build query; PostgREST returns the total in Content-Range alongside the page
+        # expand=transcription joins the summaries in the same query instead of N lookups
+        columns = f"*, transcription_summary:{TRANSCRIPTION_EMBED}(id,language,word_count,created_at)" if expand else "*"
+        query = supabase.table("projects").select(columns, count="exact").eq("user_id", user_id)
         
         if status:
             query = query.eq("status", status.value)
         
-        # Get total count
-        count_response = query.execute()
-        total = len(count_response.data)
-        
         # Apply pagination
         offset = (page - 1) * per_page
         query = query.order("created_at", desc=True).range(offset, offset + per_page - 1)
         
         # Execute query
-        response = query.execute()
+        response = await asyncio.to_thread(query.execute)
+        total = response.count or 0
         
         # Convert to models
-        projects = [Project(**p) for p in response.data]
+        projects = PROJECT_LIST_ADAPTER.validate_python(response.data)
         
         return ProjectListResponse(
             projects=projects,
@@ -390,7 +493,8 @@ async def list_projects(
 async def update_project(
     project_id: str,
     update_data: ProjectUpdate,
-    current_user: UserPrincipal = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase)
 ):
     """
     Update project metadata.
@@ -399,26 +503,16 @@ async def update_project(
         project_id: Project ID
         update_data: Fields to update
         current_user: Current authenticated user
+        supabase: Shared Supabase client
         
     Returns:
         Updated project
     """
-    user_id = current_user["sub"]
-    supabase = get_supabase_client()
+    user_id = current_user.user_id
     
     try:
-        # Check project exists and belongs to user
-        project_response = supabase.table("projects").select("*").eq(
-            "id", project_id
-        ).eq("user_id", user_id).execute()
-        
-        if not project_response.data:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        # Build update data
-        updates = {
-            "updated_at": datetime.utcnow().isoformat()
-        }
+        # Build update data; updated_at is set by the trg_projects_updated_at trigger
+        updates = {}
         
         if update_data.name is not None:
             updates["name"] = update_data.name
@@ -427,10 +521,16 @@ async def update_project(
         if update_data.tags is not None:
             updates["tags"] = update_data.tags
         
-        # Update project
-        update_response = supabase.table("projects").update(updates).eq(
-            "id", project_id
-        ).execute()
+        # Update project; scoping by user_id doubles as the ownership check.
+        # With nothing to change, just read the row back.
+        query = supabase.table("projects")
+        query = query.update(updates) if updates else query.select("*")
+        update_response = await asyncio.to_thread(
+            query.eq("id", project_id).eq("user_id", user_id).execute
+        )
+        
+        if not update_response.data:
+            raise HTTPException(status_code=404, detail="Project not found")
         
         return Project(**update_response.data[0])
         
@@ -444,7 +544,8 @@ async def update_project(
 @router.delete("/{project_id}")
 async def delete_project(
     project_id: str,
-    current_user: UserPrincipal = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase)
 ):
     """
     Delete a project and its associated data.
@@ -452,41 +553,42 @@ async def delete_project(
     Args:
         project_id: Project ID
         current_user: Current authenticated user
+        supabase: Shared Supabase client
         
     Returns:
         Success message
     """
-    user_id = current_user["sub"]
-    supabase = get_supabase_client()
+    user_id = current_user.user_id
     
     try:
-        # Check project exists and belongs to user
-        project_response = supabase.table("projects").select("*").eq(
-            "id", project_id
-        ).eq("user_id", user_id).execute()
+        # Delete project; PostgREST returns the deleted row, so an empty
+        # result means it did not exist or belongs to someone else
+        delete_response = await asyncio.to_thread(
+            supabase.table("projects").delete().eq("id", project_id).eq("user_id", user_id).execute
+        )
         
-        if not project_response.data:
+        if not delete_response.data:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        project = project_response.data[0]
+        project = delete_response.data[0]
         
-        # Delete file from storage
+        # Storage object and transcription are independent, so remove them concurrently
+        cleanup = []
         if project.get("storage_path"):
-            try:
-                supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS).remove(
-                    [project["storage_path"]]
-                )
-            except Exception as e:
-                logger.warning(f"Failed to delete file from storage: {str(e)}")
-        
-        # Delete transcription
+            cleanup.append(asyncio.to_thread(
+                supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS).remove,
+                [project["storage_path"]]
+            ))
         if project.get("transcription_id"):
-            supabase.table("transcriptions").delete().eq(
-                "id", project["transcription_id"]
-            ).execute()
+            cleanup.append(asyncio.to_thread(
+                supabase.table("transcriptions").delete().eq(
+                    "id", project["transcription_id"]
+                ).execute
+            ))
         
-        # Delete project
-        supabase.table("projects").delete().eq("id", project_id).execute()
+        for result in await asyncio.gather(*cleanup, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to clean up project data: {str(result)}")
         
         return {"message": "Project deleted successfully"}
         
@@ -499,22 +601,23 @@ async def delete_project(
 
 @router.get("/usage/stats", response_model=UserUsageStats)
 async def get_usage_stats(
-    current_user: UserPrincipal = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user),
+    supabase=Depends(get_supabase)
 ):
     """
     Get user's usage statistics.
     
     Args:
         current_user: Current authenticated user
+        supabase: Shared Supabase client
         
     Returns:
         User usage statistics
     """
-    user_id = current_user["sub"]
-    supabase = get_supabase_client()
+    user_id = current_user.user_id
     
     try:
-        return check_user_limits(user_id, supabase)
+        return await asyncio.to_thread(check_user_limits, user_id, supabase)
     except HTTPException as e:
         # Return stats even if limits exceeded
         if e.status_code == 403:
@@ -2,7 +2,7 @@ from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from app.core.security import get_current_user, UserPrincipal
-from app.api.deps import get_supabase
+from app.api.deps import get_supabase, response_data
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -26,7 +26,7 @@ async def get_me(user: UserPrincipal = Depends(get_current_user), supabase=Depen
     if supabase:
         try:
             res = supabase.table("profiles").select("*").eq("user_id", user.user_id).execute()
-            data = res.data if hasattr(res, "data") else res.get("data")
+            data = response_data(res)
             if data:
                 row = data[0]
                 return UserProfile(**{
@@ -62,7 +62,7 @@ async def update_me(update: UserProfileUpdate, user: UserPrincipal = Depends(get
             res = supabase.table("profiles").upsert(payload).execute()
             # Read back latest
             res2 = supabase.table("profiles").select("*").eq("user_id", user.user_id).execute()
-            data = res2.data if hasattr(res2, "data") else res2.get("data")
+            data = response_data(res2)
             row = (data or [{}])[0]
             return UserProfile(**{
                 "user_id": user.user_id,
@@ -1,9 +1,12 @@
-from pydantic_settings import BaseSettings
+from functools import cached_property, lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from typing import Optional
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True)
+
     # Environment
     ENV: str = Field(default="development")
     API_DEBUG: bool = Field(default=True)
@@ -22,6 +25,14 @@ class Settings(BaseSettings):
     SUPABASE_URL: Optional[str] = None
     SUPABASE_SERVICE_ROLE_KEY: Optional[str] = None
     SUPABASE_BUCKET_UPLOADS: str = Field(default="uploads")
+    SUPABASE_DB_URL: Optional[str] = Field(
+        default=None,
+        description="Direct Postgres DSN (pooler) for hot read paths; requires asyncpg",
+    )
+    SUPABASE_DB_STATEMENT_CACHE_SIZE: int = Field(
+        default=0,
+        description="asyncpg prepared-statement cache per connection; keep 0 on Supavisor transaction mode (port 6543)",
+    )
 
     # Admin
     ADMIN_USER_IDS: Optional[str] = Field(
@@ -54,6 +65,10 @@ class Settings(BaseSettings):
     MAX_AUDIO_FILE_SIZE_MB: int = Field(
         default=25, description="Maximum audio file size in MB"
     )
+    ALLOWED_AUDIO_EXTENSIONS: str = Field(
+        default=".mp3,.wav,.m4a,.mp4,.mpeg,.mpga,.webm,.ogg",
+        description="Comma-separated file extensions accepted for transcription uploads",
+    )
     COMPRESS_LARGE_FILES: bool = Field(
         default=True, description="Whether to compress large audio files"
     )
@@ -86,10 +101,29 @@ class Settings(BaseSettings):
         default=180, description="Business tier max audio duration in minutes"
     )
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    @cached_property
+    def admin_ids(self) -> frozenset[str]:
+        """ADMIN_USER_IDS parsed once into a set of Clerk user IDs."""
+        return frozenset(x.strip() for x in (self.ADMIN_USER_IDS or "").split(",") if x.strip())
+
+    @cached_property
+    def cors_origins(self) -> list[str]:
+        """CORS_ORIGINS parsed once; empty when unset."""
+        return [o.strip() for o in (self.CORS_ORIGINS or "").split(",") if o.strip()]
+
+    @cached_property
+    def allowed_extensions_set(self) -> frozenset[str]:
+        """ALLOWED_AUDIO_EXTENSIONS parsed once, lower-cased, for O(1) membership checks."""
+        return frozenset(
+            x.strip().lower() for x in self.ALLOWED_AUDIO_EXTENSIONS.split(",") if x.strip()
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build Settings once per process; call get_settings.cache_clear() to reload."""
+    return Settings()
 
 
-settings = Settings()
+settings = get_settings()
 
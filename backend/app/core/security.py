@@ -1,9 +1,21 @@
+import hashlib
+import threading
+import time
 from typing import Any, Optional
+from cachetools import TTLCache
 from fastapi import Depends, Header, HTTPException, status
 from pydantic import BaseModel
 from .config import settings
 import jwt
-from jwt import PyJWKClient, InvalidTokenError
+from jwt import (
+    PyJWKClient,
+    DecodeError,
+    InvalidAlgorithmError,
+    InvalidAudienceError,
+    InvalidIssuerError,
+    InvalidTokenError,
+    MissingRequiredClaimError,
+)
 
 
 class UserPrincipal(BaseModel):
@@ -29,13 +41,57 @@ def _get_jwks_client() -> PyJWKClient:
     if _jwks_client is None:
         if not settings.CLERK_JWKS_URL:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="CLERK_JWKS_URL not configured")
-        _jwks_client = PyJWKClient(settings.CLERK_JWKS_URL)
+        _jwks_client = PyJWKClient(settings.CLERK_JWKS_URL, cache_keys=True, lifespan=3600, max_cached_keys=16)
     return _jwks_client
 
 
+# kid -> (fetched_at, parsed public key); keys rotate rarely, so an hour is safe
+SIGNING_KEY_TTL_SECONDS = 3600
+_signing_keys: dict[str, tuple[float, Any]] = {}
+
+
+def _get_signing_key(token: str) -> Any:
+    kid = jwt.get_unverified_header(token).get("kid")
+    if not kid:
+        raise InvalidTokenError("Token header is missing kid")
+    now = time.monotonic()
+    cached = _signing_keys.get(kid)
+    if cached and now - cached[0] < SIGNING_KEY_TTL_SECONDS:
+        return cached[1]
+    key = _get_jwks_client().get_signing_key(kid).key
+    _signing_keys[kid] = (now, key)
+    return key
+
+
+# Recent verdicts keyed by token digest, so replayed tokens skip JWKS and RSA.
+# Failures are remembered for the TTL; successes until the TTL or the token's exp.
+# get_current_user runs in the threadpool, hence the lock.
+_verdicts: TTLCache = TTLCache(maxsize=1024, ttl=60)
+_verdicts_lock = threading.Lock()
+
+# Failures that no retry of the same token can fix. Time-based ones (expired, not
+# yet valid) are left out: a little clock skew on a fresh ~60s Clerk token must not
+# get it rejected for its whole lifetime.
+_PERMANENT_TOKEN_ERRORS = (
+    DecodeError,  # includes InvalidSignatureError
+    InvalidAlgorithmError,
+    InvalidAudienceError,
+    InvalidIssuerError,
+    MissingRequiredClaimError,
+)
+
+
 def verify_and_decode_jwt(token: str) -> dict[str, Any]:
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _verdicts_lock:
+        verdict = _verdicts.get(key)
+    if verdict is not None:
+        if verdict[0] == "bad":
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=verdict[1])
+        if verdict[2] > time.time():
+            return verdict[1]
     try:
-        signing_key = _get_jwks_client().get_signing_key_from_jwt(token).key
+        signing_key = _get_signing_key(token)
         options = {"require": ["exp", "iat"], "verify_aud": bool(settings.CLERK_AUDIENCE)}
         decoded = jwt.decode(
             token,
@@ -45,9 +101,15 @@ def verify_and_decode_jwt(token: str) -> dict[str, Any]:
             options=options,
             issuer=settings.CLERK_ISSUER if settings.CLERK_ISSUER else None,
         )
-        return decoded  # type: ignore
     except InvalidTokenError as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {str(e)}")
+        detail = f"Invalid token: {str(e)}"
+        if isinstance(e, _PERMANENT_TOKEN_ERRORS):
+            with _verdicts_lock:
+                _verdicts[key] = ("bad", detail)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+    with _verdicts_lock:
+        _verdicts[key] = ("good", decoded, decoded["exp"])
+    return decoded  # type: ignore
 
 
 def get_current_user(authorization: Optional[str] = Header(default=None)) -> UserPrincipal:
@@ -64,8 +126,7 @@ def get_current_user(authorization: Optional[str] = Header(default=None)) -> Use
 def admin_required(user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     if not settings.ADMIN_USER_IDS:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin not configured")
-    admin_ids = {x.strip() for x in settings.ADMIN_USER_IDS.split(",") if x.strip()}
-    if user.user_id not in admin_ids:
+    if user.user_id not in settings.admin_ids:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     return user
 
@@ -1,6 +1,9 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
+from .api.deps import close_pg_pool, get_pg_pool, get_supabase_client
 from .api.v1.routes import auth as auth_routes
 from .api.v1.routes import users as users_routes
 from .api.v1.routes import projects as projects_routes
@@ -13,33 +16,57 @@ from .api.v1.routes import admin as admin_routes
 from .api.v1.routes import anonymous as anonymous_routes
 # from .api.v1.routes import transcription_projects as transcription_routes
 
-app = FastAPI(title="Repostr API", version="1.0")
 
-# CORS
-origins = []
-if settings.CORS_ORIGINS:
-    origins = [o.strip() for o in settings.CORS_ORIGINS.split(",") if o.strip()]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm shared clients/services so the first request doesn't pay for them
+    get_supabase_client()
+    await get_pg_pool()
+    await anonymous_routes.init_anonymous_service()
+    app.state.svix_wh = None
+    if settings.CLERK_WEBHOOK_SECRET:
+        try:
+            from svix import Webhook
+
+            app.state.svix_wh = Webhook(settings.CLERK_WEBHOOK_SECRET)
+        except Exception:
+            # auth_webhook retries construction and reports the error per request
+            pass
+    yield
+    await close_pg_pool()
+
 
+app = FastAPI(
+    title="Repostr API",
+    version="1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=origins or ["*"],
+    allow_origins=settings.cors_origins or ["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 # Routers (no API version prefix to match your request)
-app.include_router(auth_routes.router)
-app.include_router(users_routes.router)
-app.include_router(projects_routes.router)
-app.include_router(files_routes.router)
-app.include_router(generate_routes.router)
-app.include_router(outputs_routes.router)
-app.include_router(templates_routes.router)
-app.include_router(billing_routes.router)
-app.include_router(admin_routes.router)
-app.include_router(anonymous_routes.router)
-# app.include_router(transcription_routes.router)
+for routes in (
+    auth_routes,
+    users_routes,
+    projects_routes,
+    files_routes,
+    generate_routes,
+    outputs_routes,
+    templates_routes,
+    billing_routes,
+    admin_routes,
+    anonymous_routes,
+    # transcription_routes,
+):
+    app.include_router(routes.router)
 
 
 @app.get("/")
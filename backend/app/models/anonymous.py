@@ -4,8 +4,9 @@ Pydantic models for anonymous upload functionality
 """
 
 from datetime import datetime
-from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
+from types import MappingProxyType
+from typing import Optional, Dict, Any, FrozenSet, List, Mapping
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
 
 
@@ -27,6 +28,8 @@ class AnonymousUploadRequest(BaseModel):
 
 class AnonymousUploadResponse(BaseModel):
     """Response from anonymous file upload"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     session_token: str = Field(..., description="Unique session token for accessing results")
     project_id: str = Field(..., description="Generated project ID")
     file_name: str = Field(..., description="Uploaded file name")
@@ -53,6 +56,8 @@ class AnonymousStatusResponse(BaseModel):
 
 class TranscriptionPreview(BaseModel):
     """Preview of transcription results (blurred)"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     preview_text: str = Field(..., description="First portion of transcription (unblurred)")
     total_word_count: int = Field(..., description="Total words in full transcription")
     duration_seconds: float = Field(..., description="Audio duration")
@@ -78,12 +83,15 @@ class AnonymousResultResponse(BaseModel):
 
 class ClaimSessionRequest(BaseModel):
     """Request to claim an anonymous session"""
+    model_config = ConfigDict(defer_build=True)
+
     # No additional fields needed - user info comes from JWT
-    pass
 
 
 class ClaimSessionResponse(BaseModel):
     """Response from claiming an anonymous session"""
+    model_config = ConfigDict(defer_build=True)
+
     success: bool = Field(..., description="Whether claim was successful")
     project_id: Optional[str] = Field(None, description="Project ID if successful")
     transcription_id: Optional[str] = Field(None, description="Transcription ID if successful")
@@ -128,14 +136,18 @@ class AnonymousSessionCreate(BaseModel):
     user_agent: Optional[str] = Field(None, description="Client user agent")
 
 
+# Shared by every AnonymousUsageLimits; immutable, so no per-instance copy
+ALLOWED_FILE_TYPES: FrozenSet[str] = frozenset({".mp3", ".wav", ".m4a", ".aac", ".ogg"})
+
+
 class AnonymousUsageLimits(BaseModel):
     """Usage limits for anonymous users"""
     max_uploads_per_hour: int = Field(999, description="Maximum uploads per hour")
     max_uploads_per_day: int = Field(999, description="Maximum uploads per day")
     max_file_size_mb: int = Field(25, description="Maximum file size in MB")
     max_duration_minutes: int = Field(60, description="Maximum audio duration in minutes")
-    allowed_file_types: List[str] = Field(
-        default=[".mp3", ".wav", ".m4a", ".aac", ".ogg"],
+    allowed_file_types: FrozenSet[str] = Field(
+        default=ALLOWED_FILE_TYPES,
         description="Allowed file extensions"
     )
 
@@ -153,6 +165,8 @@ class AnonymousRateLimitInfo(BaseModel):
 
 class AnonymousErrorResponse(BaseModel):
     """Error response for anonymous endpoints"""
+    model_config = ConfigDict(defer_build=True)
+
     error: str = Field(..., description="Error type")
     message: str = Field(..., description="Human-readable error message")
     details: Optional[Dict[str, Any]] = Field(None, description="Additional error details")
@@ -165,6 +179,9 @@ class AnonymousErrorResponse(BaseModel):
 
 # Utility functions for model validation and conversion
 
+BYTES_PER_MB = 1 << 20
+
+
 def create_conversion_message(transcription_preview: TranscriptionPreview) -> str:
     """Generate compelling conversion message based on transcription data"""
     word_count = transcription_preview.total_word_count
@@ -178,40 +195,52 @@ def create_conversion_message(transcription_preview: TranscriptionPreview) -> st
 
 def create_file_info_metadata(file_name: str, file_size: int, duration_seconds: float) -> Dict[str, Any]:
     """Create file metadata for display in conversion overlay"""
+    duration_minutes = duration_seconds / 60
     return {
         "file_name": file_name,
-        "file_size_mb": round(file_size / (1024 * 1024), 2),
-        "duration_minutes": round(duration_seconds / 60, 1),
-        "estimated_reading_time": round(duration_seconds / 60 * 0.3),  # Rough estimate
+        "file_size_mb": round(file_size / BYTES_PER_MB, 2),
+        "duration_minutes": round(duration_minutes, 1),
+        "estimated_reading_time": round(duration_minutes * 0.3),  # Rough estimate
     }
 
 
-def create_usage_stats_metadata() -> Dict[str, Any]:
+# Static social-proof figures; read-only so the shared mapping cannot be mutated
+USAGE_STATS_METADATA: Mapping[str, Any] = MappingProxyType({
+    "total_users": "10,000+",
+    "files_processed_today": "247",
+    "average_satisfaction": "4.9/5",
+    "time_saved_hours": "15,000+",
+})
+
+
+def create_usage_stats_metadata() -> Mapping[str, Any]:
     """Create usage statistics for social proof"""
-    return {
-        "total_users": "10,000+",
-        "files_processed_today": "247",
-        "average_satisfaction": "4.9/5",
-        "time_saved_hours": "15,000+",
-    }
+    return USAGE_STATS_METADATA
 
 
-def generate_preview_text(full_content: str, preview_length: int = 150) -> str:
+# generate_preview_text breaks at a period only within the last 30% of the preview
+PREVIEW_SENTENCE_RATIO = 0.7
+PREVIEW_LENGTH = 150
+PREVIEW_SENTENCE_START = int(PREVIEW_LENGTH * PREVIEW_SENTENCE_RATIO) + 1
+
+
+def generate_preview_text(full_content: str, preview_length: int = PREVIEW_LENGTH) -> str:
     """Generate preview text from full transcription"""
     if len(full_content) <= preview_length:
         return full_content
     
-    # Find a good breaking point (end of sentence or word)
-    preview = full_content[:preview_length]
-    
-    # Try to break at sentence end
-    last_period = preview.rfind('.')
-    if last_period > preview_length * 0.7:  # If period is reasonably close to end
-        return preview[:last_period + 1]
+    # Try to break at sentence end; only the tail window is searched, in place
+    sentence_start = (
+        PREVIEW_SENTENCE_START if preview_length == PREVIEW_LENGTH
+        else int(preview_length * PREVIEW_SENTENCE_RATIO) + 1
+    )
+    last_period = full_content.rfind('.', sentence_start, preview_length)
+    if last_period != -1:
+        return full_content[:last_period + 1]
     
     # Otherwise break at word boundary
-    last_space = preview.rfind(' ')
+    last_space = full_content.rfind(' ', 0, preview_length)
     if last_space > 0:
-        return preview[:last_space] + "..."
+        return full_content[:last_space] + "..."
     
-    return preview + "..."
\ No newline at end of file
+    return full_content[:preview_length] + "..."
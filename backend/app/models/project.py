@@ -6,7 +6,7 @@ Database models for managing projects and transcriptions
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ProjectStatus(str, Enum):
@@ -61,6 +61,14 @@ class TranscriptionResult(BaseModel):
     chunks_processed: Optional[int] = None
 
 
+class TranscriptionSummary(BaseModel):
+    """Lightweight transcription fields embedded in project listings."""
+    id: str
+    language: Optional[str] = None
+    word_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
 class Project(BaseModel):
     """Project model."""
     id: str
@@ -84,16 +92,12 @@ class Project(BaseModel):
     transcription_id: Optional[str] = None
     transcription_status: Optional[TranscriptionStatus] = None
     transcription_error: Optional[str] = None
+    transcription_summary: Optional[TranscriptionSummary] = None
     
     # Timestamps
     created_at: datetime
     updated_at: datetime
     transcribed_at: Optional[datetime] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class Transcription(BaseModel):
@@ -122,15 +126,12 @@ class Transcription(BaseModel):
     # Timestamps
     created_at: datetime
     updated_at: datetime
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class FileUploadResponse(BaseModel):
     """File upload response model."""
+    model_config = ConfigDict(defer_build=True, frozen=True, extra="forbid")
+
     project_id: str
     file_name: str
     file_size: int
@@ -141,6 +142,8 @@ class FileUploadResponse(BaseModel):
 
 class TranscriptionJobResponse(BaseModel):
     """Transcription job response model."""
+    model_config = ConfigDict(defer_build=True)
+
     project_id: str
     transcription_id: Optional[str] = None
     status: TranscriptionStatus
@@ -150,12 +153,16 @@ class TranscriptionJobResponse(BaseModel):
 
 class ProjectWithTranscription(BaseModel):
     """Project with full transcription data."""
+    model_config = ConfigDict(defer_build=True)
+
     project: Project
     transcription: Optional[Transcription] = None
     
     
 class ProjectListResponse(BaseModel):
     """Project list response."""
+    model_config = ConfigDict(defer_build=True)
+
     projects: List[Project]
     total: int
     page: int
@@ -165,6 +172,8 @@ class ProjectListResponse(BaseModel):
 
 class UserUsageStats(BaseModel):
     """User usage statistics for tier limits."""
+    model_config = ConfigDict(defer_build=True)
+
     projects_this_month: int
     monthly_limit: int
     total_projects: int
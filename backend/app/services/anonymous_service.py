@@ -3,15 +3,19 @@ Anonymous Session Service
 Business logic for anonymous upload functionality following backend best practices
 """
 
+import hashlib
+import os
 import secrets
-import uuid
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, Tuple
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Optional, Dict, Any, Tuple
 from pathlib import Path
 import asyncio
+import time
 
+from cachetools import TLRUCache
 from loguru import logger
-from fastapi import HTTPException, Request
+from fastapi import HTTPException, Request, UploadFile
 from supabase import Client as SupabaseClient
 
 from app.models.anonymous import (
@@ -25,15 +29,129 @@ from app.models.anonymous import (
     TranscriptionPreview,
     AnonymousUsageLimits,
     AnonymousRateLimitInfo,
+    BYTES_PER_MB,
     create_conversion_message,
     create_file_info_metadata,
     create_usage_stats_metadata,
     generate_preview_text
 )
+from app.api.deps import client_ip as client_ip_from
 from app.core.config import settings
-from app.services.transcription.manager import TranscriptionManager
+from app.services.transcription.manager import TranscriptionManager, get_transcription_manager
 from app.services.background_tasks import background_service
 
+# Read uploads in bounded chunks rather than materializing the whole file
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _sniff_audio_type(head: bytes) -> Optional[str]:
+    """Extension implied by a file's leading bytes, or None if the format isn't recognised."""
+    if head.startswith(b"ID3"):
+        return ".mp3"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return ".wav"
+    if head[4:8] == b"ftyp":
+        return ".m4a"
+    if head.startswith(b"OggS"):
+        return ".ogg"
+    if head.startswith(b"fLaC"):
+        return ".flac"
+    if head.startswith(b"\x1aE\xdf\xa3"):
+        return ".webm"
+    if len(head) >= 2 and head[0] == 0xFF:
+        if head[1] & 0xF6 == 0xF0:  # ADTS frame sync
+            return ".aac"
+        if head[1] & 0xE0 == 0xE0:  # MPEG audio frame sync
+            return ".mp3"
+    return None
+
+# Status polling cache: sessions still in flight change often, settled ones rarely
+STATUS_CACHE_TTL_ACTIVE = 3
+STATUS_CACHE_TTL_SETTLED = 60
+_ACTIVE_STATUSES = frozenset({AnonymousSessionStatus.UPLOADED, AnonymousSessionStatus.PROCESSING})
+
+
+def _status_cache_ttu(_token: str, response: AnonymousStatusResponse, now: float) -> float:
+    """Expiry for a cached status: by session state, and never past the session itself."""
+    ttl = STATUS_CACHE_TTL_ACTIVE if response.status in _ACTIVE_STATUSES else STATUS_CACHE_TTL_SETTLED
+    return now + min(ttl, response.expires_at.timestamp() - time.time())
+
+
+_status_cache: TLRUCache = TLRUCache(maxsize=10_000, ttu=_status_cache_ttu)
+
+# Fixed HTTPException details, built once; raise sites merge in per-request fields
+_SESSION_NOT_FOUND_DETAIL = {
+    "error": "session_not_found",
+    "message": "Session token not found or invalid.",
+    "signup_suggestion": "Sign up to create an account and manage your transcriptions!"
+}
+_SESSION_EXPIRED_DETAIL = {
+    "error": "session_expired",
+    "message": "This session has expired. Anonymous sessions are valid for 7 days.",
+    "signup_suggestion": "Sign up to keep your transcriptions forever!"
+}
+_TRANSCRIPTION_NOT_FOUND_DETAIL = {
+    "error": "transcription_not_found",
+    "message": "Transcription not found for this session.",
+    "signup_suggestion": "Sign up to create an account and manage your transcriptions!"
+}
+_CLAIM_NOT_FOUND_DETAIL = {
+    "success": False,
+    "error": "session_not_found",
+    "message": "Session token not found or invalid."
+}
+_CLAIM_EXPIRED_DETAIL = {
+    "success": False,
+    "error": "session_expired",
+    "message": "This session has expired and cannot be claimed."
+}
+_ALREADY_CLAIMED_DETAIL = {
+    "success": False,
+    "error": "already_claimed",
+    "message": "This session has already been claimed by another user."
+}
+_UPLOAD_FAILED_DETAIL = {
+    "error": "upload_failed",
+    "message": "Failed to process upload. Please try again."
+}
+_STATUS_CHECK_FAILED_DETAIL = {
+    "error": "status_check_failed",
+    "message": "Failed to check status. Please try again."
+}
+_RESULTS_FETCH_FAILED_DETAIL = {
+    "error": "results_fetch_failed",
+    "message": "Failed to fetch results. Please try again."
+}
+_CLAIM_FAILED_DETAIL = {
+    "success": False,
+    "error": "claim_failed",
+    "message": "Failed to claim session. Please try again."
+}
+
+
+def _internal_error(
+    log_message: str,
+    base_detail: Dict[str, Any],
+    correlation_id: str,
+    error: Exception
+) -> HTTPException:
+    """
+    Log an unexpected failure and build the 500 for the caller to raise.
+    
+    Kept out of the public methods so their except blocks stay a single call.
+    Must be called from inside the except block so the traceback is logged.
+    """
+    logger.opt(exception=settings.API_DEBUG).error(
+        log_message,
+        correlation_id=correlation_id,
+        error=str(error),
+        error_type=type(error).__name__
+    )
+    return HTTPException(
+        status_code=500,
+        detail={**base_detail, "correlation_id": correlation_id}
+    )
+
 
 class AnonymousService:
     """
@@ -43,28 +161,32 @@ class AnonymousService:
     
     def __init__(self, supabase: SupabaseClient):
         self.supabase = supabase
-        self.transcription_manager = TranscriptionManager()
         self.usage_limits = AnonymousUsageLimits()
+    
+    @property
+    def transcription_manager(self) -> TranscriptionManager:
+        """Shared manager; transcription itself runs in background_service, so build it lazily."""
+        return get_transcription_manager()
         
     async def create_anonymous_upload(
         self,
-        file_content: bytes,
-        file_name: str,
+        file: UploadFile,
         project_name: str,
         description: Optional[str] = None,
         language: Optional[str] = "en",
-        request: Optional[Request] = None
+        request: Optional[Request] = None,
+        correlation_id: Optional[str] = None
     ) -> AnonymousUploadResponse:
         """
         Create anonymous upload session and start processing.
         
         Args:
-            file_content: Raw file bytes
-            file_name: Original file name
+            file: Uploaded file, read in chunks and spooled to disk
             project_name: User-provided project name
             description: Optional project description
             language: Language code for transcription
             request: FastAPI request object for IP/user-agent
+            correlation_id: Request correlation ID (generated if omitted)
             
         Returns:
             AnonymousUploadResponse with session token and status
@@ -72,64 +194,72 @@ class AnonymousService:
         Raises:
             HTTPException: If validation fails or rate limits exceeded
         """
-        correlation_id = str(uuid.uuid4())
+        correlation_id = correlation_id or secrets.token_hex(8)
+        file_name = file.filename
         logger.info(
             "Starting anonymous upload",
             correlation_id=correlation_id,
             file_name=file_name,
-            file_size=len(file_content),
             project_name=project_name
         )
         
+        spool_path: Optional[str] = None
+        usage_id: Optional[str] = None
         try:
             # Extract client info
-            client_ip = self._get_client_ip(request)
+            client_ip = client_ip_from(request)
             user_agent = self._get_user_agent(request)
             
-            # Check rate limits
-            await self._check_rate_limits(client_ip, correlation_id)
+            # Validate file type before reading any of the body
+            file_ext = Path(file_name).suffix.lower()
+            self._validate_file_type(file_ext)
+            
+            # Check rate limits (also reserves this upload's slot against them)
+            usage_id = await self._check_rate_limits(client_ip, correlation_id)
             
-            # Validate file
-            self._validate_file(file_content, file_name, correlation_id)
+            # Stream to a temp file, rejecting oversized files mid-read
+            spool_path, file_size, file_sha256 = await self._spool_upload(file, file_ext)
+            
+            logger.info(
+                "File validation passed",
+                correlation_id=correlation_id,
+                file_size_mb=round(file_size / BYTES_PER_MB, 2),
+                file_sha256=file_sha256,
+                file_ext=file_ext
+            )
             
             # Generate session token
             session_token = self._generate_session_token()
+            token_prefix = session_token[:16]
             
             # Create storage path
-            storage_path = f"anonymous/{session_token[:16]}/{file_name}"
+            storage_path = f"anonymous/{token_prefix}/{file_name}"
             
             # Upload file to storage
-            await self._upload_file_to_storage(
-                file_content, storage_path, correlation_id
-            )
+            with open(spool_path, "rb") as file_obj:
+                await self._upload_file_to_storage(
+                    file_obj, file_size, storage_path, correlation_id,
+                    file_sha256=file_sha256
+                )
             
             # Create anonymous session record
             session_data = AnonymousSessionCreate(
                 session_token=session_token,
                 file_name=file_name,
-                file_size=len(file_content),
+                file_size=file_size,
                 storage_path=storage_path,
                 ip_address=client_ip,
                 user_agent=user_agent
             )
             
-            session = await self._create_session_record(
-                session_data, correlation_id
-            )
-            
-            # Create project record
-            project_id = await self._create_anonymous_project(
-                session.id,
+            # Session, project and the link between them in one transaction
+            project_id = await self._create_upload_records(
+                session_data,
                 project_name,
                 description,
-                language,
-                len(file_content),
                 correlation_id
             )
             
-            # Update session with project_id
-            await self._update_session_project(session.id, project_id, correlation_id)
-            
             # Start transcription in background
             estimated_time = await self._start_transcription_job(
                 project_id,
@@ -139,13 +269,13 @@ class AnonymousService:
                 correlation_id
             )
             
-            # Track usage for rate limiting
-            await self._track_anonymous_usage(client_ip, correlation_id)
+            # The upload went through, so its reserved slot now counts
+            usage_id = None
             
             logger.info(
                 "Anonymous upload created successfully",
                 correlation_id=correlation_id,
-                session_token=session_token[:16] + "...",
+                session_token=token_prefix + "...",
                 project_id=project_id,
                 estimated_time=estimated_time
             )
@@ -154,40 +284,34 @@ class AnonymousService:
                 session_token=session_token,
                 project_id=project_id,
                 file_name=file_name,
-                file_size=len(file_content),
+                file_size=file_size,
                 status=AnonymousSessionStatus.PROCESSING,
                 estimated_time_seconds=estimated_time,
-                expires_at=datetime.utcnow() + timedelta(days=7),
+                expires_at=datetime.now(timezone.utc) + timedelta(days=7),
                 message=f"File uploaded successfully. Processing will complete in approximately {estimated_time} seconds."
             )
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(
-                "Failed to create anonymous upload",
-                correlation_id=correlation_id,
-                error=str(e),
-                exc_info=True
-            )
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "upload_failed",
-                    "message": "Failed to process upload. Please try again.",
-                    "correlation_id": correlation_id
-                }
-            )
+            raise _internal_error("Failed to create anonymous upload", _UPLOAD_FAILED_DETAIL, correlation_id, e)
+        finally:
+            if spool_path:
+                os.unlink(spool_path)
+            if usage_id:
+                await self._release_upload_slot(usage_id, correlation_id)
     
     async def get_session_status(
         self,
-        session_token: str
+        session_token: str,
+        correlation_id: Optional[str] = None
     ) -> AnonymousStatusResponse:
         """
         Get current status of anonymous session.
         
         Args:
             session_token: Session token from upload
+            correlation_id: Request correlation ID (generated if omitted)
             
         Returns:
             AnonymousStatusResponse with current status
@@ -195,13 +319,17 @@ class AnonymousService:
         Raises:
             HTTPException: If session not found or expired
         """
-        correlation_id = str(uuid.uuid4())
+        correlation_id = correlation_id or secrets.token_hex(8)
         logger.info(
             "Getting session status",
             correlation_id=correlation_id,
             session_token=session_token[:16] + "..."
         )
         
+        cached = _status_cache.get(session_token)
+        if cached is not None:
+            return cached
+        
         try:
             # Get session from database
             session = await self._get_session_by_token(session_token, correlation_id)
@@ -210,11 +338,7 @@ class AnonymousService:
             if self._is_session_expired(session.expires_at):
                 raise HTTPException(
                     status_code=410,
-                    detail={
-                        "error": "session_expired",
-                        "message": "This session has expired. Anonymous sessions are valid for 7 days.",
-                        "signup_suggestion": "Sign up to keep your transcriptions forever!"
-                    }
+                    detail=_SESSION_EXPIRED_DETAIL
                 )
             
             # Get progress if processing
@@ -222,19 +346,19 @@ class AnonymousService:
             estimated_time_remaining = None
             error_message = None
             
-            if session.status == AnonymousSessionStatus.PROCESSING:
+            if session.status is AnonymousSessionStatus.PROCESSING:
                 # Check transcription progress
                 progress_info = await self._get_transcription_progress(
                     session.project_id, correlation_id
                 )
                 progress_percentage = progress_info.get("progress_percentage")
                 estimated_time_remaining = progress_info.get("estimated_time_remaining")
-            elif session.status == AnonymousSessionStatus.FAILED:
+            elif session.status is AnonymousSessionStatus.FAILED:
                 error_message = await self._get_error_message(
                     session.project_id, correlation_id
                 )
             
-            return AnonymousStatusResponse(
+            response = AnonymousStatusResponse(
                 session_token=session_token,
                 status=session.status,
                 progress_percentage=progress_percentage,
@@ -246,34 +370,25 @@ class AnonymousService:
                 is_expired=False,
                 error_message=error_message
             )
+            _status_cache[session_token] = response
+            return response
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(
-                "Failed to get session status",
-                correlation_id=correlation_id,
-                error=str(e),
-                exc_info=True
-            )
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "status_check_failed",
-                    "message": "Failed to check status. Please try again.",
-                    "correlation_id": correlation_id
-                }
-            )
+            raise _internal_error("Failed to get session status", _STATUS_CHECK_FAILED_DETAIL, correlation_id, e)
     
     async def get_blurred_results(
         self,
-        session_token: str
+        session_token: str,
+        correlation_id: Optional[str] = None
     ) -> AnonymousResultResponse:
         """
         Get blurred transcription results for conversion.
         
         Args:
             session_token: Session token from upload
+            correlation_id: Request correlation ID (generated if omitted)
             
         Returns:
             AnonymousResultResponse with blurred content and conversion CTA
@@ -281,7 +396,7 @@ class AnonymousService:
         Raises:
             HTTPException: If session not found, expired, or not ready
         """
-        correlation_id = str(uuid.uuid4())
+        correlation_id = correlation_id or secrets.token_hex(8)
         logger.info(
             "Getting blurred results",
             correlation_id=correlation_id,
@@ -296,15 +411,11 @@ class AnonymousService:
             if self._is_session_expired(session.expires_at):
                 raise HTTPException(
                     status_code=410,
-                    detail={
-                        "error": "session_expired",
-                        "message": "This session has expired. Anonymous sessions are valid for 7 days.",
-                        "signup_suggestion": "Sign up to keep your transcriptions forever!"
-                    }
+                    detail=_SESSION_EXPIRED_DETAIL
                 )
             
             # Check if still processing
-            if session.status == AnonymousSessionStatus.PROCESSING:
+            if session.status is AnonymousSessionStatus.PROCESSING:
                 raise HTTPException(
                     status_code=202,
                     detail={
@@ -315,7 +426,7 @@ class AnonymousService:
                 )
             
             # Check if failed
-            if session.status == AnonymousSessionStatus.FAILED:
+            if session.status is AnonymousSessionStatus.FAILED:
                 error_message = await self._get_error_message(
                     session.project_id, correlation_id
                 )
@@ -336,11 +447,7 @@ class AnonymousService:
             if not transcription:
                 raise HTTPException(
                     status_code=404,
-                    detail={
-                        "error": "transcription_not_found",
-                        "message": "Transcription not found for this session.",
-                        "signup_suggestion": "Sign up to create an account and manage your transcriptions!"
-                    }
+                    detail=_TRANSCRIPTION_NOT_FOUND_DETAIL
                 )
             
             # Create blurred preview
@@ -390,25 +497,13 @@ class AnonymousService:
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(
-                "Failed to get blurred results",
-                correlation_id=correlation_id,
-                error=str(e),
-                exc_info=True
-            )
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "results_fetch_failed",
-                    "message": "Failed to fetch results. Please try again.",
-                    "correlation_id": correlation_id
-                }
-            )
+            raise _internal_error("Failed to get blurred results", _RESULTS_FETCH_FAILED_DETAIL, correlation_id, e)
     
     async def claim_session_for_user(
         self,
         session_token: str,
-        user_id: str
+        user_id: str,
+        correlation_id: Optional[str] = None
     ) -> ClaimSessionResponse:
         """
         Claim anonymous session for authenticated user.
@@ -416,6 +511,7 @@ class AnonymousService:
         Args:
             session_token: Session token to claim
             user_id: Authenticated user ID from JWT
+            correlation_id: Request correlation ID (generated if omitted)
             
         Returns:
             ClaimSessionResponse with full content and project data
@@ -423,7 +519,7 @@ class AnonymousService:
         Raises:
             HTTPException: If session not found, expired, or already claimed
         """
-        correlation_id = str(uuid.uuid4())
+        correlation_id = correlation_id or secrets.token_hex(8)
         logger.info(
             "Claiming session for user",
             correlation_id=correlation_id,
@@ -442,29 +538,17 @@ class AnonymousService:
                 if error_code == "Session not found":
                     raise HTTPException(
                         status_code=404,
-                        detail={
-                            "success": False,
-                            "error": "session_not_found",
-                            "message": "Session token not found or invalid."
-                        }
+                        detail=_CLAIM_NOT_FOUND_DETAIL
                     )
                 elif error_code == "Session expired":
                     raise HTTPException(
                         status_code=410,
-                        detail={
-                            "success": False,
-                            "error": "session_expired",
-                            "message": "This session has expired and cannot be claimed."
-                        }
+                        detail=_CLAIM_EXPIRED_DETAIL
                     )
                 elif error_code == "Session already claimed":
                     raise HTTPException(
                         status_code=409,
-                        detail={
-                            "success": False,
-                            "error": "already_claimed",
-                            "message": "This session has already been claimed by another user."
-                        }
+                        detail=_ALREADY_CLAIMED_DETAIL
                     )
                 else:
                     raise HTTPException(
@@ -476,12 +560,13 @@ class AnonymousService:
                         }
                     )
             
-            # Get full project and transcription data
-            project_data = await self._get_project_data(
-                result["project_id"], correlation_id
-            )
-            transcription_data = await self._get_transcription_data(
-                result["transcription_id"], correlation_id
+            # Polls should see the claim right away, not after the cache entry expires
+            _status_cache.pop(session_token, None)
+            
+            # Get full project and transcription data (independent, so fetch together)
+            project_data, transcription_data = await asyncio.gather(
+                self._get_project_data(result["project_id"], correlation_id),
+                self._get_transcription_data(result["transcription_id"], correlation_id)
             )
             
             logger.info(
@@ -506,48 +591,35 @@ class AnonymousService:
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(
-                "Failed to claim session",
-                correlation_id=correlation_id,
-                error=str(e),
-                exc_info=True
-            )
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "success": False,
-                    "error": "claim_failed",
-                    "message": "Failed to claim session. Please try again.",
-                    "correlation_id": correlation_id
-                }
-            )
+            raise _internal_error("Failed to claim session", _CLAIM_FAILED_DETAIL, correlation_id, e)
     
     async def get_rate_limit_info(
         self,
-        client_ip: str
+        client_ip: str,
+        correlation_id: Optional[str] = None
     ) -> AnonymousRateLimitInfo:
         """
         Get current rate limit status for IP address.
         
         Args:
             client_ip: Client IP address
+            correlation_id: Request correlation ID (generated if omitted)
             
         Returns:
             AnonymousRateLimitInfo with current usage and limits
         """
-        correlation_id = str(uuid.uuid4())
+        correlation_id = correlation_id or secrets.token_hex(8)
+        now = datetime.now(timezone.utc)
         
         try:
             # Get current usage from database/cache
-            hour_usage = await self._get_hourly_usage(client_ip)
-            day_usage = await self._get_daily_usage(client_ip)
+            hour_usage, day_usage = await self._get_usage(client_ip)
             
             # Calculate remaining
             hour_remaining = max(0, self.usage_limits.max_uploads_per_hour - hour_usage)
             day_remaining = max(0, self.usage_limits.max_uploads_per_day - day_usage)
             
             # Calculate reset times
-            now = datetime.utcnow()
             hour_reset = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
             day_reset = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
             
@@ -576,41 +648,16 @@ class AnonymousService:
                 uploads_used_day=self.usage_limits.max_uploads_per_day,
                 uploads_remaining_hour=0,
                 uploads_remaining_day=0,
-                reset_time_hour=datetime.utcnow() + timedelta(hours=1),
-                reset_time_day=datetime.utcnow() + timedelta(days=1),
+                reset_time_hour=now + timedelta(hours=1),
+                reset_time_day=now + timedelta(days=1),
                 is_limited=True
             )
     
     # Private helper methods
     
     def _is_session_expired(self, session_expires_at: datetime) -> bool:
-        """Check if session is expired, handling timezone-aware comparisons."""
-        current_time = datetime.utcnow()
-        if hasattr(session_expires_at, 'tzinfo') and session_expires_at.tzinfo:
-            # Database datetime is timezone-aware, make current_time aware too
-            from datetime import timezone
-            current_time = current_time.replace(tzinfo=timezone.utc)
-        return session_expires_at < current_time
-    
-    def _get_client_ip(self, request: Optional[Request]) -> Optional[str]:
-        """Extract client IP from request headers."""
-        if not request:
-            return None
-        
-        # Check common proxy headers
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-        
-        # Fallback to direct client
-        if hasattr(request, "client") and request.client:
-            return request.client.host
-        
-        return None
+        """Check if session is expired; expires_at is a timestamptz, so always aware."""
+        return session_expires_at < datetime.now(timezone.utc)
     
     def _get_user_agent(self, request: Optional[Request]) -> Optional[str]:
         """Extract user agent from request headers."""
@@ -622,20 +669,34 @@ class AnonymousService:
         """Generate secure session token."""
         return secrets.token_urlsafe(48)  # 64 characters, URL-safe
     
-    def _validate_file(
-        self,
-        file_content: bytes,
-        file_name: str,
-        correlation_id: str
-    ) -> None:
+    def _validate_file_type(self, file_ext: str) -> None:
+        """
+        Validate uploaded file extension (lower-cased, with dot) against anonymous limits.
+        
+        Raises:
+            HTTPException: If the file type is not allowed
+        """
+        if file_ext not in self.usage_limits.allowed_file_types:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "invalid_file_type",
+                    "message": f"File type {file_ext} not supported for anonymous uploads.",
+                    "details": {
+                        "allowed_types": sorted(self.usage_limits.allowed_file_types)
+                    },
+                    "signup_suggestion": "Sign up for free to upload more file types!"
+                }
+            )
+    
+    def _validate_file_size(self, file_size: int) -> None:
         """
-        Validate uploaded file against anonymous limits.
+        Validate uploaded file size against anonymous limits.
         
         Raises:
-            HTTPException: If validation fails
+            HTTPException: If the file is too large
         """
-        # Check file size
-        file_size_mb = len(file_content) / (1024 * 1024)
+        file_size_mb = file_size / BYTES_PER_MB
         if file_size_mb > self.usage_limits.max_file_size_mb:
             raise HTTPException(
                 status_code=413,
@@ -649,37 +710,58 @@ class AnonymousService:
                     "signup_suggestion": "Sign up for free to upload files up to 25MB!"
                 }
             )
+    
+    async def _spool_upload(self, file: UploadFile, file_ext: str) -> Tuple[str, int, str]:
+        """
+        Copy an upload to a temp file in fixed-size chunks.
         
-        # Check file extension
-        file_ext = Path(file_name).suffix.lower()
-        if file_ext not in self.usage_limits.allowed_file_types:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "invalid_file_type",
-                    "message": f"File type {file_ext} not supported for anonymous uploads.",
-                    "details": {
-                        "allowed_types": self.usage_limits.allowed_file_types
-                    },
-                    "signup_suggestion": "Sign up for free to upload more file types!"
-                }
-            )
+        The size limit is enforced and the SHA-256 digest computed in the same
+        pass, so oversized files are rejected without buffering the whole body
+        in memory and the body is never re-read for integrity checks. The first
+        chunk is also sniffed, so a recognisable but disallowed format is
+        rejected whatever the file is named.
         
-        logger.info(
-            "File validation passed",
-            correlation_id=correlation_id,
-            file_size_mb=round(file_size_mb, 2),
-            file_ext=file_ext
-        )
+        Returns:
+            Tuple of (temp file path, file size in bytes, hex SHA-256 digest)
+            
+        Raises:
+            HTTPException: If the file exceeds the size limit or its content is a disallowed type
+        """
+        spool = tempfile.NamedTemporaryFile(delete=False, suffix=file_ext)
+        digest = hashlib.sha256()
+        max_bytes = self.usage_limits.max_file_size_mb * BYTES_PER_MB
+        file_size = 0
+        try:
+            with spool:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    if not file_size:
+                        sniffed_ext = _sniff_audio_type(chunk)
+                        if sniffed_ext:
+                            self._validate_file_type(sniffed_ext)
+                    file_size += len(chunk)
+                    if file_size > max_bytes:
+                        self._validate_file_size(file_size)
+                    digest.update(chunk)
+                    spool.write(chunk)
+        except BaseException:
+            os.unlink(spool.name)
+            raise
+        return spool.name, file_size, digest.hexdigest()
     
     async def _check_rate_limits(
         self,
         client_ip: Optional[str],
         correlation_id: str
-    ) -> None:
+    ) -> Optional[str]:
         """
-        Check if client has exceeded rate limits.
+        Check if client has exceeded rate limits, reserving a slot for the upload if not.
+        
+        The count and the usage insert happen in one track_anonymous_upload
+        call, so concurrent uploads from one IP can't both slip under the limit.
         
+        Returns:
+            ID of the reserved usage_tracking row, to release if the upload fails
+            
         Raises:
             HTTPException: If rate limits exceeded
         """
@@ -688,15 +770,34 @@ class AnonymousService:
                 "No client IP for rate limiting",
                 correlation_id=correlation_id
             )
-            return
+            return None
         
-        # Get current usage
-        hour_usage = await self._get_hourly_usage(client_ip)
-        day_usage = await self._get_daily_usage(client_ip)
+        # Get current usage and track this upload in one round trip
+        usage_id = None
+        try:
+            query = self.supabase.rpc(
+                "track_anonymous_upload",
+                {
+                    "p_user_id": f"anonymous_{client_ip}",
+                    "p_ip_address": client_ip,
+                    "p_max_per_hour": self.usage_limits.max_uploads_per_hour,
+                    "p_max_per_day": self.usage_limits.max_uploads_per_day
+                }
+            )
+            response = await asyncio.to_thread(query.execute)
+            usage = response.data[0]
+            hour_usage = usage["hour_usage"]
+            day_usage = usage["day_usage"]
+            usage_id = usage.get("usage_id")
+        except Exception as e:
+            logger.warning(f"Rate limit check failed: {e}")
+            # Conservative fallback
+            hour_usage = self.usage_limits.max_uploads_per_hour
+            day_usage = self.usage_limits.max_uploads_per_day
         
         # Check hourly limit
         if hour_usage >= self.usage_limits.max_uploads_per_hour:
-            now = datetime.utcnow()
+            now = datetime.now(timezone.utc)
             next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
             retry_after = int((next_hour - now).total_seconds())
             
@@ -712,7 +813,7 @@ class AnonymousService:
         
         # Check daily limit
         if day_usage >= self.usage_limits.max_uploads_per_day:
-            now = datetime.utcnow()
+            now = datetime.now(timezone.utc)
             next_day = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
             retry_after = int((next_day - now).total_seconds())
             
@@ -733,22 +834,39 @@ class AnonymousService:
             hour_usage=hour_usage,
             day_usage=day_usage
         )
+        return usage_id
+    
+    async def _release_upload_slot(self, usage_id: str, correlation_id: str) -> None:
+        """Delete the usage row reserved by _check_rate_limits after a failed upload."""
+        try:
+            query = self.supabase.table("usage_tracking").delete().eq("id", usage_id)
+            await asyncio.to_thread(query.execute)
+        except Exception as e:
+            logger.warning(
+                f"Failed to release upload slot: {e}",
+                correlation_id=correlation_id,
+                usage_id=usage_id
+            )
     
     # Database operation methods implementation
     
     async def _upload_file_to_storage(
         self,
-        file_content: bytes,
+        file_obj: BinaryIO,
+        file_size: int,
         storage_path: str,
-        correlation_id: str
+        correlation_id: str,
+        file_sha256: Optional[str] = None
     ) -> str:
         """
         Upload file to Supabase storage.
         
         Args:
-            file_content: Raw file bytes
+            file_obj: Open binary file, streamed to storage
+            file_size: File size in bytes
             storage_path: Path in storage bucket
             correlation_id: Request correlation ID
+            file_sha256: Hex SHA-256 of the file, computed while spooling
             
         Returns:
             Public URL of uploaded file
@@ -761,15 +879,16 @@ class AnonymousService:
                 "Uploading file to storage",
                 correlation_id=correlation_id,
                 storage_path=storage_path,
-                file_size=len(file_content)
+                file_size=file_size,
+                file_sha256=file_sha256
             )
             
-            # Upload to Supabase storage
-            upload_response = self.supabase.storage.from_(
-                settings.SUPABASE_BUCKET_UPLOADS
-            ).upload(
+            # Upload to Supabase storage; the SDK call is blocking, so keep it off the event loop
+            bucket = self.supabase.storage.from_(settings.SUPABASE_BUCKET_UPLOADS)
+            upload_response = await asyncio.to_thread(
+                bucket.upload,
                 storage_path,
-                file_content,
+                file_obj,
                 {"content-type": "application/octet-stream"}
             )
             
@@ -784,9 +903,7 @@ class AnonymousService:
                 raise Exception(f"Storage upload failed with status {upload_response.status_code}")
             
             # Get public URL
-            public_url = self.supabase.storage.from_(
-                settings.SUPABASE_BUCKET_UPLOADS
-            ).get_public_url(storage_path)
+            public_url = bucket.get_public_url(storage_path)
             
             logger.info(
                 "File uploaded successfully",
@@ -806,89 +923,20 @@ class AnonymousService:
             )
             raise
     
-    async def _create_session_record(
+    async def _create_upload_records(
         self,
         session_data: AnonymousSessionCreate,
-        correlation_id: str
-    ) -> AnonymousSession:
-        """
-        Create anonymous session record in database.
-        
-        Args:
-            session_data: Session creation data
-            correlation_id: Request correlation ID
-            
-        Returns:
-            Created AnonymousSession
-            
-        Raises:
-            Exception: If database operation fails
-        """
-        try:
-            logger.info(
-                "Creating session record",
-                correlation_id=correlation_id,
-                session_token=session_data.session_token[:16] + "..."
-            )
-            
-            # Prepare session data for database
-            session_record = {
-                "session_token": session_data.session_token,
-                "file_name": session_data.file_name,
-                "file_size": session_data.file_size,
-                "storage_path": session_data.storage_path,
-                "status": AnonymousSessionStatus.UPLOADED.value,
-                "ip_address": session_data.ip_address,
-                "user_agent": session_data.user_agent,
-                "expires_at": (datetime.utcnow() + timedelta(days=7)).isoformat(),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            
-            # Insert into database
-            response = self.supabase.table("anonymous_sessions").insert(
-                session_record
-            ).execute()
-            
-            if not response.data:
-                raise Exception("Failed to create session record")
-            
-            session = AnonymousSession(**response.data[0])
-            
-            logger.info(
-                "Session record created",
-                correlation_id=correlation_id,
-                session_id=session.id
-            )
-            
-            return session
-            
-        except Exception as e:
-            logger.error(
-                "Session record creation failed",
-                correlation_id=correlation_id,
-                error=str(e)
-            )
-            raise
-    
-    async def _create_anonymous_project(
-        self,
-        session_id: str,
         project_name: str,
         description: Optional[str],
-        language: Optional[str],
-        file_size: int,
         correlation_id: str
     ) -> str:
         """
-        Create anonymous project record.
+        Create the anonymous session and its project via create_anonymous_upload.
         
         Args:
-            session_id: Anonymous session ID
+            session_data: Session creation data
             project_name: User-provided project name
             description: Optional description
-            language: Language code
-            file_size: File size in bytes
             correlation_id: Request correlation ID
             
         Returns:
@@ -899,94 +947,44 @@ class AnonymousService:
         """
         try:
             logger.info(
-                "Creating anonymous project",
+                "Creating session and project records",
                 correlation_id=correlation_id,
-                session_id=session_id,
+                session_token=session_data.session_token[:16] + "...",
                 project_name=project_name
             )
             
-            project_id = str(uuid.uuid4())
-            
-            # Prepare project data
-            project_record = {
-                "id": project_id,
-                "user_id": None,  # Anonymous project
-                "anonymous_session_id": session_id,
-                "title": project_name,
-                "description": description,
-                "status": "uploading",
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            
-            # Insert into database
-            response = self.supabase.table("projects").insert(
-                project_record
-            ).execute()
-            
-            if not response.data:
-                raise Exception("Failed to create project record")
-            
-            logger.info(
-                "Anonymous project created",
-                correlation_id=correlation_id,
-                project_id=project_id
+            query = self.supabase.rpc(
+                "create_anonymous_upload",
+                {
+                    "p_session_token": session_data.session_token,
+                    "p_file_name": session_data.file_name,
+                    "p_file_size": session_data.file_size,
+                    "p_storage_path": session_data.storage_path,
+                    "p_ip_address": session_data.ip_address,
+                    "p_user_agent": session_data.user_agent,
+                    "p_title": project_name,
+                    "p_description": description
+                }
             )
+            response = await asyncio.to_thread(query.execute)
             
-            return project_id
+            if not response.data:
+                raise Exception("Failed to create session and project records")
             
-        except Exception as e:
-            logger.error(
-                "Anonymous project creation failed",
-                correlation_id=correlation_id,
-                error=str(e)
-            )
-            raise
-    
-    async def _update_session_project(
-        self,
-        session_id: str,
-        project_id: str,
-        correlation_id: str
-    ) -> None:
-        """
-        Update session with project ID.
-        
-        Args:
-            session_id: Session ID to update
-            project_id: Project ID to associate
-            correlation_id: Request correlation ID
+            record = response.data[0]
             
-        Raises:
-            Exception: If database operation fails
-        """
-        try:
             logger.info(
-                "Updating session with project ID",
+                "Session and project records created",
                 correlation_id=correlation_id,
-                session_id=session_id,
-                project_id=project_id
+                session_id=record["session_id"],
+                project_id=record["project_id"]
             )
             
-            # Update session record
-            response = self.supabase.table("anonymous_sessions").update({
-                "project_id": project_id,
-                "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", session_id).execute()
-            
-            if not response.data:
-                raise Exception("Failed to update session with project ID")
-            
-            logger.info(
-                "Session updated with project ID",
-                correlation_id=correlation_id,
-                session_id=session_id,
-                project_id=project_id
-            )
+            return record["project_id"]
             
         except Exception as e:
             logger.error(
-                "Session project update failed",
+                "Session and project creation failed",
                 correlation_id=correlation_id,
                 error=str(e)
             )
@@ -1032,10 +1030,7 @@ class AnonymousService:
                 language=language or "en"
             )
             
-            # Update project status
-            await self._update_project_status(
-                project_id, "processing", correlation_id
-            )
+            # The task itself marks the session and project as processing
             
             # Estimate processing time (rough calculation)
             estimated_time = 45  # Default estimate for anonymous uploads
@@ -1079,10 +1074,11 @@ class AnonymousService:
             correlation_id: Request correlation ID
         """
         try:
-            response = self.supabase.table("projects").update({
+            query = self.supabase.table("projects").update({
                 "status": status,
-                "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", project_id).execute()
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }).eq("id", project_id)
+            response = await asyncio.to_thread(query.execute)
             
             logger.info(
                 "Project status updated",
@@ -1100,50 +1096,6 @@ class AnonymousService:
                 error=str(e)
             )
     
-    async def _track_anonymous_usage(
-        self,
-        client_ip: Optional[str],
-        correlation_id: str
-    ) -> None:
-        """
-        Track anonymous usage for rate limiting.
-        
-        Args:
-            client_ip: Client IP address
-            correlation_id: Request correlation ID
-        """
-        try:
-            if not client_ip:
-                return
-            
-            # Track usage in database or cache
-            usage_record = {
-                "user_id": f"anonymous_{client_ip}",
-                "resource_type": "anonymous_upload",
-                "credits_used": 1,
-                "metadata": {
-                    "ip_address": client_ip,
-                    "timestamp": datetime.utcnow().isoformat()
-                },
-                "created_at": datetime.utcnow().isoformat()
-            }
-            
-            self.supabase.table("usage_tracking").insert(usage_record).execute()
-            
-            logger.info(
-                "Anonymous usage tracked",
-                correlation_id=correlation_id,
-                client_ip=client_ip
-            )
-            
-        except Exception as e:
-            logger.warning(
-                "Usage tracking failed",
-                correlation_id=correlation_id,
-                error=str(e)
-            )
-            # Don't fail the request if usage tracking fails
-    
     async def _get_session_by_token(
         self,
         session_token: str,
@@ -1169,18 +1121,15 @@ class AnonymousService:
                 session_token=session_token[:16] + "..."
             )
             
-            response = self.supabase.table("anonymous_sessions").select("*").eq(
+            query = self.supabase.table("anonymous_sessions").select("*").eq(
                 "session_token", session_token
-            ).execute()
+            )
+            response = await asyncio.to_thread(query.execute)
             
             if not response.data:
                 raise HTTPException(
                     status_code=404,
-                    detail={
-                        "error": "session_not_found",
-                        "message": "Session token not found or invalid.",
-                        "signup_suggestion": "Sign up to create an account and manage your transcriptions!"
-                    }
+                    detail=_SESSION_NOT_FOUND_DETAIL
                 )
             
             session = AnonymousSession(**response.data[0])
@@ -1231,9 +1180,10 @@ class AnonymousService:
                 return {"progress_percentage": None, "estimated_time_remaining": None}
             
             # Check project status
-            response = self.supabase.table("projects").select("*").eq(
+            query = self.supabase.table("projects").select("*").eq(
                 "id", project_id
-            ).execute()
+            )
+            response = await asyncio.to_thread(query.execute)
             
             if not response.data:
                 return {"progress_percentage": None, "estimated_time_remaining": None}
@@ -1243,7 +1193,7 @@ class AnonymousService:
             
             # Estimate progress based on status and time elapsed
             created_at = datetime.fromisoformat(project["created_at"].replace("Z", "+00:00"))
-            elapsed_seconds = (datetime.utcnow().replace(tzinfo=created_at.tzinfo) - created_at).total_seconds()
+            elapsed_seconds = (datetime.now(timezone.utc) - created_at).total_seconds()
             
             if status == "processing":
                 # Rough progress estimation
@@ -1283,9 +1233,10 @@ class AnonymousService:
             if not project_id:
                 return None
             
-            response = self.supabase.table("projects").select("error_message").eq(
+            query = self.supabase.table("projects").select("error_message").eq(
                 "id", project_id
-            ).execute()
+            )
+            response = await asyncio.to_thread(query.execute)
             
             if response.data:
                 return response.data[0].get("error_message")
@@ -1316,9 +1267,10 @@ class AnonymousService:
             Transcription data dictionary
         """
         try:
-            response = self.supabase.table("transcriptions").select("*").eq(
+            query = self.supabase.table("transcriptions").select("*").eq(
                 "anonymous_session_id", session_id
-            ).execute()
+            )
+            response = await asyncio.to_thread(query.execute)
             
             if response.data:
                 return response.data[0]
@@ -1359,13 +1311,14 @@ class AnonymousService:
             )
             
             # Call database function for atomic claim
-            response = self.supabase.rpc(
+            query = self.supabase.rpc(
                 "claim_anonymous_session",
                 {
                     "p_session_token": session_token,
                     "p_user_id": user_id
                 }
-            ).execute()
+            )
+            response = await asyncio.to_thread(query.execute)
             
             if not response.data:
                 raise Exception("Database function returned no data")
@@ -1408,9 +1361,8 @@ class AnonymousService:
             Project data dictionary
         """
         try:
-            response = self.supabase.table("projects").select("*").eq(
-                "id", project_id
-            ).execute()
+            query = self.supabase.table("projects").select("*").eq("id", project_id)
+            response = await asyncio.to_thread(query.execute)
             
             if response.data:
                 return response.data[0]
@@ -1441,9 +1393,8 @@ class AnonymousService:
             Transcription data dictionary
         """
         try:
-            response = self.supabase.table("transcriptions").select("*").eq(
-                "id", transcription_id
-            ).execute()
+            query = self.supabase.table("transcriptions").select("*").eq("id", transcription_id)
+            response = await asyncio.to_thread(query.execute)
             
             if response.data:
                 return response.data[0]
@@ -1458,52 +1409,27 @@ class AnonymousService:
             )
             return {}
     
-    async def _get_hourly_usage(self, client_ip: str) -> int:
+    async def _get_usage(self, client_ip: str) -> Tuple[int, int]:
         """
-        Get hourly upload count for IP.
+        Get hourly and daily upload counts for IP in one query.
         
         Args:
             client_ip: Client IP address
             
         Returns:
-            Number of uploads in current hour
+            Tuple of (uploads in current hour, uploads in current day)
         """
         try:
-            hour_start = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
-            
-            response = self.supabase.table("usage_tracking").select("id").eq(
-                "user_id", f"anonymous_{client_ip}"
-            ).eq("resource_type", "anonymous_upload").gte(
-                "created_at", hour_start.isoformat()
-            ).execute()
-            
-            return len(response.data) if response.data else 0
-            
-        except Exception as e:
-            logger.warning(f"Hourly usage check failed: {e}")
-            return self.usage_limits.max_uploads_per_hour  # Conservative fallback
-    
-    async def _get_daily_usage(self, client_ip: str) -> int:
-        """
-        Get daily upload count for IP.
-        
-        Args:
-            client_ip: Client IP address
-            
-        Returns:
-            Number of uploads in current day
-        """
-        try:
-            day_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            response = self.supabase.table("usage_tracking").select("id").eq(
-                "user_id", f"anonymous_{client_ip}"
-            ).eq("resource_type", "anonymous_upload").gte(
-                "created_at", day_start.isoformat()
-            ).execute()
+            query = self.supabase.rpc(
+                "anonymous_upload_usage",
+                {"p_user_id": f"anonymous_{client_ip}"}
+            )
+            response = await asyncio.to_thread(query.execute)
             
-            return len(response.data) if response.data else 0
+            usage = response.data[0]
+            return usage["hour_usage"], usage["day_usage"]
             
         except Exception as e:
-            logger.warning(f"Daily usage check failed: {e}")
-            return self.usage_limits.max_uploads_per_day  # Conservative fallback
\ No newline at end of file
+            logger.warning(f"Usage check failed: {e}")
+            # Conservative fallback
+            return self.usage_limits.max_uploads_per_hour, self.usage_limits.max_uploads_per_day
@@ -9,7 +9,7 @@ from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 
-from app.services.transcription import TranscriptionManager
+from app.services.transcription import get_transcription_manager
 from app.api.deps import get_supabase_client
 from app.core.config import settings
 
@@ -19,7 +19,7 @@ class BackgroundTaskService:
     
     def __init__(self):
         """Initialize background task service."""
-        self.transcription_manager = TranscriptionManager()
+        self.transcription_manager = get_transcription_manager()
         self.executor = ThreadPoolExecutor(max_workers=2)
         self.tasks = {}  # Track running tasks
     
@@ -243,12 +243,12 @@ class BackgroundTaskService:
             }
             
         except Exception as e:
-            logger.error(
+            logger.opt(exception=settings.API_DEBUG).error(
                 "Anonymous transcription failed",
                 correlation_id=correlation_id,
                 project_id=project_id,
                 error=str(e),
-                exc_info=True
+                error_type=type(e).__name__
             )
             
             # Update session and project status to failed
@@ -308,12 +308,9 @@ class BackgroundTaskService:
         """
         task_id = f"transcription_{project_id}"
         
-        # Create async task
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
+        # Run on a worker thread with its own event loop, closed when the task ends
         future = self.executor.submit(
-            loop.run_until_complete,
+            asyncio.run,
             self.process_transcription(project_id, storage_path, user_id, language)
         )
         
@@ -343,12 +340,9 @@ class BackgroundTaskService:
         """
         task_id = f"anonymous_transcription_{project_id}"
         
-        # Create async task
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
+        # Run on a worker thread with its own event loop, closed when the task ends
         future = self.executor.submit(
-            loop.run_until_complete,
+            asyncio.run,
             self.process_anonymous_transcription(project_id, storage_path, session_token, language)
         )
         
@@ -3,7 +3,8 @@
 from app.services.transcription.manager import (
     TranscriptionManager,
     TranscriptionProvider,
-    TranscriptionStatus
+    TranscriptionStatus,
+    get_transcription_manager
 )
 from app.services.transcription.groq_service import GroqTranscriptionService
 
@@ -21,6 +22,7 @@ __all__ = [
     "TranscriptionManager",
     "TranscriptionProvider",
     "TranscriptionStatus",
+    "get_transcription_manager",
     "GroqTranscriptionService",
     "AudioProcessor"
 ]
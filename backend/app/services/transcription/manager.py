@@ -4,6 +4,7 @@ Orchestrates the transcription process with provider fallback and chunking suppo
 """
 
 import asyncio
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 from enum import Enum
 from datetime import datetime
@@ -465,3 +466,10 @@ class TranscriptionManager:
         except Exception as e:
             logger.error(f"Failed to update transcription results: {str(e)}")
             # Don't raise exception to avoid breaking the transcription process
+
+
+@lru_cache(maxsize=1)
+def get_transcription_manager() -> TranscriptionManager:
+    """Process-wide TranscriptionManager, built on first use.
+    Shared so provider clients and the request-rate window aren't duplicated per consumer."""
+    return TranscriptionManager()
@@ -0,0 +1,18 @@
+"""HTTP response helpers shared by route modules."""
+
+import hashlib
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def etag_response(request: Request, payload, max_age: int = 30) -> Response:
+    """Serialize `payload` with a strong ETag, answering 304 when the client already has it."""
+    body = orjson.dumps(payload)
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}, must-revalidate"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
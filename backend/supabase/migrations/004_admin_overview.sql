@@ -0,0 +1,50 @@
+-- Migration: Admin overview RPC
+-- Description: Returns recent users and projects for the admin dashboard in one round trip
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== HELPER FUNCTIONS ==========
+
+-- Function to fetch the admin overview (users + projects) in a single call
+CREATE OR REPLACE FUNCTION public.admin_overview(
+    _limit INTEGER DEFAULT 100
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT json_build_object(
+        'users', COALESCE((
+            SELECT json_agg(u)
+            FROM (
+                SELECT p.user_id, p.name, p.created_at, p.updated_at
+                FROM public.profiles p
+                ORDER BY p.user_id
+                LIMIT _limit
+            ) u
+        ), '[]'::json),
+        'projects', COALESCE((
+            SELECT json_agg(pr)
+            FROM (
+                SELECT p.id, p.user_id, p.title, p.description, p.created_at, p.updated_at
+                FROM public.projects p
+                ORDER BY p.created_at DESC
+                LIMIT _limit
+            ) pr
+        ), '[]'::json)
+    );
+$$;
+
+-- Only the backend (service role) may call this; it bypasses RLS
+REVOKE ALL ON FUNCTION public.admin_overview(INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.admin_overview(INTEGER) TO service_role;
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check function: SELECT proname FROM pg_proc WHERE proname = 'admin_overview';
+-- 2. Call it: SELECT public.admin_overview(10);
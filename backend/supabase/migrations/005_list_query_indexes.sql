@@ -0,0 +1,32 @@
+-- Migration: Indexes for per-user list queries
+-- Description: Composite indexes matching the WHERE/ORDER BY of the files, outputs and projects list routes
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so unlike the
+-- other migrations this file has no BEGIN/COMMIT. Run it statement by statement.
+
+-- ========== FILES ==========
+-- list_files: WHERE user_id = ? AND project_id = ? ORDER BY created_at DESC
+-- INCLUDE makes the projected columns an index-only scan
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_files_user_project_created
+    ON public.files (user_id, project_id, created_at DESC)
+    INCLUDE (id, path, mime_type, size_bytes, public_url);
+
+-- ========== OUTPUTS ==========
+-- list_outputs: WHERE project_id = ? AND user_id = ? ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outputs_project_user_created
+    ON public.outputs (project_id, user_id, created_at DESC);
+
+-- ========== PROJECTS ==========
+-- list_projects: WHERE user_id = ? ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_projects_user_created
+    ON public.projects (user_id, created_at DESC);
+
+-- Single-row reads/updates/deletes filter on id first and use the primary key,
+-- so no (project_id, user_id, id) index is added.
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check indexes: SELECT indexname FROM pg_indexes WHERE indexname LIKE 'idx_%_created';
+-- 2. Check plan: EXPLAIN SELECT id, path FROM public.files WHERE user_id = 'x' AND project_id = gen_random_uuid() ORDER BY created_at DESC LIMIT 50;
@@ -0,0 +1,49 @@
+-- Migration: User usage stats RPC
+-- Description: Aggregates a user's monthly/all-time project counts and monthly duration in one call
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+--
+-- The (user_id, created_at DESC) index this function relies on is created by
+-- 005_list_query_indexes.sql (idx_projects_user_created).
+
+BEGIN;
+
+-- ========== UPDATE PROJECTS TABLE ==========
+-- The transcription routes record the media duration on the project row
+ALTER TABLE public.projects
+  ADD COLUMN IF NOT EXISTS duration_seconds FLOAT;
+
+-- ========== HELPER FUNCTIONS ==========
+
+-- Function to compute check_user_limits' numbers in a single scan
+CREATE OR REPLACE FUNCTION public.user_usage_stats(
+    uid TEXT,
+    month_start TIMESTAMPTZ
+)
+RETURNS TABLE(
+    projects_this_month BIGINT,
+    total_duration_seconds DOUBLE PRECISION,
+    total_projects BIGINT
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT
+        count(*) FILTER (WHERE p.created_at >= month_start),
+        coalesce(sum(p.duration_seconds) FILTER (WHERE p.created_at >= month_start), 0),
+        count(*)
+    FROM public.projects p
+    WHERE p.user_id = uid;
+$$;
+
+-- Only the backend (service role) may call this; it bypasses RLS
+REVOKE ALL ON FUNCTION public.user_usage_stats(TEXT, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.user_usage_stats(TEXT, TIMESTAMPTZ) TO service_role;
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check function: SELECT proname FROM pg_proc WHERE proname = 'user_usage_stats';
+-- 2. Call it: SELECT * FROM public.user_usage_stats('user_123', date_trunc('month', now()));
@@ -0,0 +1,33 @@
+-- Migration: Project -> transcription foreign key
+-- Description: Declares projects.transcription_id as a FK so PostgREST can embed the transcription in project reads
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== UPDATE PROJECTS TABLE ==========
+ALTER TABLE public.projects
+  ADD COLUMN IF NOT EXISTS transcription_id UUID;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint
+    WHERE conname = 'projects_transcription_id_fkey'
+  ) THEN
+    ALTER TABLE public.projects
+      ADD CONSTRAINT projects_transcription_id_fkey
+      FOREIGN KEY (transcription_id) REFERENCES public.transcriptions(id) ON DELETE SET NULL;
+  END IF;
+END$$;
+
+-- Reload the PostgREST schema cache so the new relationship is embeddable
+NOTIFY pgrst, 'reload schema';
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check constraint: SELECT conname FROM pg_constraint WHERE conname = 'projects_transcription_id_fkey';
+-- 2. Check embed: GET /rest/v1/projects?select=*,transcription:transcriptions!projects_transcription_id_fkey(*)&limit=1
+--    (transcriptions.project_id also links the tables, so the FK must be named)
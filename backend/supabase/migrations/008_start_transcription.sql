@@ -0,0 +1,47 @@
+-- Migration: Start transcription RPC
+-- Description: Atomically flips a project to pending transcription if it is owned, idle and within the duration limit
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== HELPER FUNCTIONS ==========
+
+-- Function to claim a project for transcription in a single UPDATE ... RETURNING.
+-- Returns one row with what the worker needs, or no rows if any precondition fails.
+CREATE OR REPLACE FUNCTION public.start_transcription(
+    pid UUID,
+    uid TEXT,
+    max_minutes DOUBLE PRECISION
+)
+RETURNS TABLE(
+    storage_path TEXT,
+    language TEXT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE public.projects p
+    SET transcription_status = 'pending',
+        updated_at = now()
+    WHERE p.id = pid
+      AND p.user_id = uid
+      AND p.transcription_status IS DISTINCT FROM 'processing'
+      AND p.transcription_status IS DISTINCT FROM 'completed'
+      AND (p.duration_seconds IS NULL OR p.duration_seconds / 60 <= max_minutes)
+    RETURNING p.storage_path, p.language;
+END;
+$$;
+
+-- Only the backend (service role) may call this; it bypasses RLS
+REVOKE ALL ON FUNCTION public.start_transcription(UUID, TEXT, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.start_transcription(UUID, TEXT, DOUBLE PRECISION) TO service_role;
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check function: SELECT proname FROM pg_proc WHERE proname = 'start_transcription';
+-- 2. Call it: SELECT * FROM public.start_transcription(gen_random_uuid(), 'user_123', 60);  -- expect no rows
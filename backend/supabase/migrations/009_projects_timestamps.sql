@@ -0,0 +1,26 @@
+-- Migration: Server-side project timestamps
+-- Description: Lets Postgres own projects.created_at/updated_at via defaults and an update trigger
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== UPDATE PROJECTS TABLE ==========
+ALTER TABLE public.projects
+  ALTER COLUMN created_at SET DEFAULT now(),
+  ALTER COLUMN updated_at SET DEFAULT now();
+
+-- Add trigger for updated_at (set_updated_at is shared with anonymous_sessions)
+DROP TRIGGER IF EXISTS trg_projects_updated_at ON public.projects;
+CREATE TRIGGER trg_projects_updated_at
+    BEFORE UPDATE ON public.projects
+    FOR EACH ROW
+    EXECUTE FUNCTION public.set_updated_at();
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check trigger: SELECT tgname FROM pg_trigger WHERE tgname = 'trg_projects_updated_at';
+-- 2. Check defaults: SELECT column_name, column_default FROM information_schema.columns
+--    WHERE table_name = 'projects' AND column_name IN ('created_at', 'updated_at');
@@ -0,0 +1,22 @@
+-- Migration: Project upload hashes
+-- Description: Stores the SHA-256 of each uploaded file so repeat uploads return the existing project
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== UPDATE PROJECTS TABLE ==========
+ALTER TABLE public.projects
+  ADD COLUMN IF NOT EXISTS file_sha256 TEXT;
+
+-- upload_file dedupe lookup: WHERE user_id = ? AND file_sha256 = ?
+CREATE INDEX IF NOT EXISTS idx_projects_user_sha256
+    ON public.projects (user_id, file_sha256)
+    WHERE file_sha256 IS NOT NULL;
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check column: SELECT column_name FROM information_schema.columns WHERE table_name = 'projects' AND column_name = 'file_sha256';
+-- 2. Check index: SELECT indexname FROM pg_indexes WHERE indexname = 'idx_projects_user_sha256';
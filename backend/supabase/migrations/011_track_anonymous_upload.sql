@@ -0,0 +1,67 @@
+-- Migration: Anonymous upload rate limit RPC
+-- Description: Checks the hourly/daily anonymous upload limits and records the upload in one round trip
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== HELPER FUNCTIONS ==========
+
+-- Function to count an IP's anonymous uploads for the current UTC hour/day and,
+-- if both are under their limits, record a new one. Always returns one row with
+-- the counts seen before the insert and whether the upload was allowed.
+CREATE OR REPLACE FUNCTION public.track_anonymous_upload(
+    p_user_id TEXT,
+    p_ip_address TEXT,
+    p_max_per_hour INTEGER,
+    p_max_per_day INTEGER
+)
+RETURNS TABLE(
+    hour_usage INTEGER,
+    day_usage INTEGER,
+    allowed BOOLEAN
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_now_utc TIMESTAMP := NOW() AT TIME ZONE 'UTC';
+BEGIN
+    -- Serialize concurrent uploads from the same IP so they can't both pass the check
+    PERFORM pg_advisory_xact_lock(hashtext(p_user_id));
+
+    SELECT
+        COUNT(*) FILTER (WHERE u.created_at >= date_trunc('hour', v_now_utc) AT TIME ZONE 'UTC')::INTEGER,
+        COUNT(*)::INTEGER
+    INTO hour_usage, day_usage
+    FROM public.usage_tracking u
+    WHERE u.user_id = p_user_id
+      AND u.resource_type = 'anonymous_upload'
+      AND u.created_at >= date_trunc('day', v_now_utc) AT TIME ZONE 'UTC';
+
+    allowed := hour_usage < p_max_per_hour AND day_usage < p_max_per_day;
+
+    IF allowed THEN
+        INSERT INTO public.usage_tracking (user_id, resource_type, credits_used, metadata)
+        VALUES (
+            p_user_id,
+            'anonymous_upload',
+            1,
+            jsonb_build_object('ip_address', p_ip_address, 'timestamp', NOW())
+        );
+    END IF;
+
+    RETURN NEXT;
+END;
+$$;
+
+-- Only the backend (service role) may call this; it bypasses RLS
+REVOKE ALL ON FUNCTION public.track_anonymous_upload(TEXT, TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.track_anonymous_upload(TEXT, TEXT, INTEGER, INTEGER) TO service_role;
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check function: SELECT proname FROM pg_proc WHERE proname = 'track_anonymous_upload';
+-- 2. Call it: SELECT * FROM public.track_anonymous_upload('anonymous_test', '127.0.0.1', 0, 0);  -- expect allowed = false
@@ -0,0 +1,62 @@
+-- Migration: Anonymous upload creation RPC
+-- Description: Creates an anonymous session and its project, and links them, in one transaction
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== HELPER FUNCTIONS ==========
+
+-- Function to create the session row, the anonymous project pointing at it, and the
+-- session -> project link in one call. The two foreign keys point at each other, so
+-- this still takes three statements, but a failure now rolls all of them back.
+CREATE OR REPLACE FUNCTION public.create_anonymous_upload(
+    p_session_token TEXT,
+    p_file_name TEXT,
+    p_file_size BIGINT,
+    p_storage_path TEXT,
+    p_ip_address TEXT,
+    p_user_agent TEXT,
+    p_title TEXT,
+    p_description TEXT
+)
+RETURNS TABLE(
+    session_id UUID,
+    project_id UUID
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    INSERT INTO public.anonymous_sessions (
+        session_token, file_name, file_size, storage_path, status, ip_address, user_agent
+    )
+    VALUES (
+        p_session_token, p_file_name, p_file_size, p_storage_path, 'uploaded',
+        p_ip_address::INET, p_user_agent
+    )
+    RETURNING id INTO session_id;
+
+    INSERT INTO public.projects (user_id, anonymous_session_id, title, description, status)
+    VALUES (NULL, session_id, p_title, p_description, 'uploading')
+    RETURNING id INTO project_id;
+
+    UPDATE public.anonymous_sessions s
+    SET project_id = create_anonymous_upload.project_id
+    WHERE s.id = create_anonymous_upload.session_id;
+
+    RETURN NEXT;
+END;
+$$;
+
+-- Only the backend (service role) may call this; it bypasses RLS
+REVOKE ALL ON FUNCTION public.create_anonymous_upload(TEXT, TEXT, BIGINT, TEXT, TEXT, TEXT, TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_anonymous_upload(TEXT, TEXT, BIGINT, TEXT, TEXT, TEXT, TEXT, TEXT) TO service_role;
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check function: SELECT proname FROM pg_proc WHERE proname = 'create_anonymous_upload';
+-- 2. Call it inside a transaction you roll back:
+--    BEGIN; SELECT * FROM public.create_anonymous_upload('test_token', 'a.mp3', 1, 'anonymous/test/a.mp3', NULL, NULL, 'Test', NULL); ROLLBACK;
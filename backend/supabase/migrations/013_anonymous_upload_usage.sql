@@ -0,0 +1,41 @@
+-- Migration: Anonymous upload usage RPC
+-- Description: Returns an IP's hourly and daily anonymous upload counts in one query
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== HELPER FUNCTIONS ==========
+
+-- Function to count an IP's anonymous uploads for the current UTC hour and day.
+-- Read-only counterpart of track_anonymous_upload, used for the rate-limit info endpoint.
+CREATE OR REPLACE FUNCTION public.anonymous_upload_usage(
+    p_user_id TEXT
+)
+RETURNS TABLE(
+    hour_usage INTEGER,
+    day_usage INTEGER
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT
+        COUNT(*) FILTER (WHERE u.created_at >= date_trunc('hour', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC')::INTEGER,
+        COUNT(*)::INTEGER
+    FROM public.usage_tracking u
+    WHERE u.user_id = p_user_id
+      AND u.resource_type = 'anonymous_upload'
+      AND u.created_at >= date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+$$;
+
+-- Only the backend (service role) may call this; it bypasses RLS
+REVOKE ALL ON FUNCTION public.anonymous_upload_usage(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.anonymous_upload_usage(TEXT) TO service_role;
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check function: SELECT proname FROM pg_proc WHERE proname = 'anonymous_upload_usage';
+-- 2. Call it: SELECT * FROM public.anonymous_upload_usage('anonymous_127.0.0.1');  -- expect one row
@@ -0,0 +1,27 @@
+-- Migration: Anonymous lookup indexes
+-- Description: Drops the duplicate session_token index and adds a partial index for anonymous upload counts
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== ANONYMOUS SESSIONS ==========
+-- session_token is UNIQUE, so anonymous_sessions_session_token_key already serves
+-- every token lookup (status, results, claim); this second index only slows inserts
+DROP INDEX IF EXISTS public.idx_anonymous_sessions_token;
+
+-- ========== USAGE TRACKING ==========
+-- track_anonymous_upload / anonymous_upload_usage:
+-- WHERE user_id = ? AND resource_type = 'anonymous_upload' AND created_at >= ?
+CREATE INDEX IF NOT EXISTS idx_usage_tracking_anonymous_uploads
+    ON public.usage_tracking (user_id, created_at DESC)
+    WHERE resource_type = 'anonymous_upload';
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check indexes: SELECT indexname FROM pg_indexes
+--    WHERE tablename IN ('anonymous_sessions', 'usage_tracking');
+-- 2. Check plan: EXPLAIN SELECT * FROM public.anonymous_sessions WHERE session_token = 'x';
+--    (expect an index scan on anonymous_sessions_session_token_key)
@@ -0,0 +1,53 @@
+-- Migration: Start transcription RPC fixes
+-- Description: Stops start_transcription from re-claiming pending projects and casts its result columns to TEXT
+-- Date: 2026-10-15
+-- Safe to run multiple times (idempotent)
+
+BEGIN;
+
+-- ========== HELPER FUNCTIONS ==========
+
+-- Function to claim a project for transcription in a single UPDATE ... RETURNING.
+-- Returns one row with what the worker needs, or no rows if any precondition fails.
+-- A pending project is already claimed (the worker hasn't flipped it to processing
+-- yet), so only projects with no status or a failed one can be claimed.
+-- projects.language is VARCHAR(10); RETURN QUERY needs the declared TEXT exactly.
+CREATE OR REPLACE FUNCTION public.start_transcription(
+    pid UUID,
+    uid TEXT,
+    max_minutes DOUBLE PRECISION
+)
+RETURNS TABLE(
+    storage_path TEXT,
+    language TEXT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE public.projects p
+    SET transcription_status = 'pending',
+        updated_at = now()
+    WHERE p.id = pid
+      AND p.user_id = uid
+      AND (p.transcription_status IS NULL
+           OR p.transcription_status NOT IN ('pending', 'processing', 'completed'))
+      AND (p.duration_seconds IS NULL OR p.duration_seconds / 60 <= max_minutes)
+    RETURNING p.storage_path::TEXT, p.language::TEXT;
+END;
+$$;
+
+-- Only the backend (service role) may call this; it bypasses RLS
+REVOKE ALL ON FUNCTION public.start_transcription(UUID, TEXT, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.start_transcription(UUID, TEXT, DOUBLE PRECISION) TO service_role;
+
+COMMIT;
+
+-- ========== MIGRATION COMPLETE ==========
+-- To verify the migration:
+-- 1. Check function: SELECT proname FROM pg_proc WHERE proname = 'start_transcription';
+-- 2. Call it twice on an idle project inside a transaction you roll back:
+--    BEGIN; SELECT * FROM public.start_transcription('<project_id>', '<user_id>', 60);  -- expect one row
+--    SELECT * FROM public.start_transcription('<project_id>', '<user_id>', 60);  -- expect no rows
+--    ROLLBACK;
@@ -0,0 +1,34 @@
+"""
+Transcription project route tests
+Run from backend/ with: python -m pytest tests
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+from fastapi import HTTPException
+
+from app.api.v1.routes import transcription_projects
+
+
+def _empty_supabase() -> MagicMock:
+    """Supabase mock whose every query chain returns no rows."""
+    supabase = MagicMock()
+    query = supabase.table.return_value.select.return_value
+    query.eq.return_value = query
+    query.limit.return_value = query
+    query.execute.return_value = MagicMock(data=[])
+    return supabase
+
+
+def test_get_project_names_transcription_fk():
+    supabase = _empty_supabase()
+    user = MagicMock(user_id="user_123")
+
+    try:
+        asyncio.run(transcription_projects.get_project("project_1", user, supabase))
+    except HTTPException as e:
+        assert e.status_code == 404
+
+    columns = supabase.table.return_value.select.call_args.args[0]
+    assert "transcription:transcriptions!projects_transcription_id_fkey(*)" in columns